@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+# --- CACHÉ DE RESULTADOS DEL MOTOR ---
+# Guarda resultados de simulate() por una huella de las entradas que realmente lee el motor
+# (motor.config_entrada) más las opciones de simulate() y la versión del código del motor.
+# Primer nivel en memoria (LRU) y segundo nivel opcional en disco (un fichero pickle por
+# resultado, también con los menos usados descartados primero).
+#
+# Los resultados se comparten entre llamadas: no deben modificarse.
+import datetime
+import hashlib
+import json
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+import motor
+import tuneles
+
+_version_motor = None
+
+
+# Huella del código del motor: un resultado guardado en disco no sirve si cambia la lógica
+def version_motor():
+    global _version_motor
+    if _version_motor is None:
+        h = hashlib.sha256()
+        for modulo in (motor, tuneles):
+            with open(modulo.__file__, "rb") as f:
+                h.update(f.read())
+        _version_motor = h.hexdigest()[:16]
+    return _version_motor
+
+
+# Valor en forma canónica para JSON (5 y 5.0 dan la misma simulación)
+def _canonico(valor):
+    if valor is None or isinstance(valor, (bool, str)): return valor
+    if isinstance(valor, (int, float)): return float(valor)
+    if isinstance(valor, (datetime.date, datetime.datetime)): return valor.isoformat()
+    if isinstance(valor, dict): return {str(k): _canonico(v) for k, v in valor.items()}
+    if isinstance(valor, (list, tuple)): return [_canonico(v) for v in valor]
+    if hasattr(valor, "a_dict"): return _canonico(valor.a_dict()) # motor.PuntoControl
+    if hasattr(valor, "item"): return _canonico(valor.item()) # Escalares de numpy
+    if hasattr(valor, "tolist"): return _canonico(valor.tolist()) # Arrays de numpy
+    return repr(valor)
+
+
+# Clave de caché de simulate(config, **opciones)
+def clave_config(config, **opciones):
+    entrada = {"config": _canonico(motor.config_entrada(config)), "opciones": _canonico(opciones), "version": version_motor()}
+    return hashlib.sha256(json.dumps(entrada, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+
+class CacheResultados:
+    # max_memoria: resultados en memoria; directorio: carpeta del nivel en disco (None = sin disco)
+    def __init__(self, max_memoria=16, directorio=None, max_disco=200):
+        self.max_memoria = max_memoria
+        self.directorio = directorio
+        self.max_disco = max_disco
+        self._memoria = OrderedDict()
+        self._lock = threading.Lock() # La app comparte la caché entre sesiones (hilos)
+        self.aciertos = 0; self.fallos = 0
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+
+    # Igual que motor.simulate(config, **opciones), pero sin repetir simulaciones ya hechas
+    # diagnostico y on_progreso (opcionales) no entran en la clave: no cambian el resultado
+    def simular(self, config, diagnostico=None, on_progreso=None, **opciones):
+        clave = clave_config(config, **opciones)
+        resultado = self.obtener(clave)
+        if resultado is None:
+            resultado = motor.simulate(config, diagnostico=diagnostico, on_progreso=on_progreso, **opciones)
+            self.guardar(clave, resultado)
+            if diagnostico is not None: diagnostico.contar("cache_fallos")
+        elif diagnostico is not None:
+            diagnostico.contar("cache_aciertos")
+        return resultado
+
+    def obtener(self, clave):
+        with self._lock:
+            resultado = self._memoria.get(clave)
+            if resultado is not None:
+                self._memoria.move_to_end(clave)
+                self.aciertos += 1
+                return resultado
+        resultado = self._leer_disco(clave)
+        with self._lock:
+            if resultado is None:
+                self.fallos += 1
+            else:
+                self.aciertos += 1
+                self._guardar_memoria(clave, resultado)
+        return resultado
+
+    def guardar(self, clave, resultado):
+        with self._lock:
+            self._guardar_memoria(clave, resultado)
+        self._escribir_disco(clave, resultado)
+
+    def limpiar(self):
+        with self._lock:
+            self._memoria.clear()
+        for ruta in self._ficheros_disco():
+            os.remove(ruta)
+
+    def _guardar_memoria(self, clave, resultado):
+        self._memoria[clave] = resultado
+        self._memoria.move_to_end(clave)
+        while len(self._memoria) > self.max_memoria:
+            self._memoria.popitem(last=False)
+
+    def _ruta(self, clave):
+        return os.path.join(self.directorio, clave + ".pkl")
+
+    def _ficheros_disco(self):
+        if not self.directorio: return []
+        return [os.path.join(self.directorio, f) for f in os.listdir(self.directorio) if f.endswith(".pkl")]
+
+    def _leer_disco(self, clave):
+        if not self.directorio: return None
+        ruta = self._ruta(clave)
+        try:
+            with open(ruta, "rb") as f:
+                resultado = pickle.load(f)
+            os.utime(ruta) # Marca de uso para descartar primero los menos usados
+            return resultado
+        except FileNotFoundError:
+            return None
+        except Exception: # Fichero incompleto o de otra versión: se descarta
+            try: os.remove(ruta)
+            except OSError: pass
+            return None
+
+    def _escribir_disco(self, clave, resultado):
+        if not self.directorio: return
+        ruta = self._ruta(clave)
+        temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporal, "wb") as f:
+            pickle.dump(resultado, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporal, ruta) # Escritura atómica: otro proceso nunca lee un fichero a medias
+        ficheros = self._ficheros_disco()
+        if len(ficheros) > self.max_disco:
+            ficheros.sort(key=os.path.getmtime)
+            for viejo in ficheros[:len(ficheros) - self.max_disco]:
+                try: os.remove(viejo)
+                except OSError: pass
@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+# --- CARGA DE CONFIGURACIÓN (sin Streamlit) ---
+# Lee la hoja "Parametro / Valor" publicada como CSV y devuelve un diccionario
+# con las mismas claves que usa la pestaña de configuración. La usan tanto la
+# app como los procesos por lotes.
+#
+# FuenteConfig añade a la descarga una copia local de la última hoja válida (se lee
+# al instante al arrancar), peticiones condicionales (ETag / Last-Modified) y
+# refresco en segundo plano, para que una hoja lenta o caída no bloquee la app.
+# pandas y requests se importan al usarlos (importar el módulo no los carga).
+import datetime
+import io
+import json
+import os
+import threading
+import time
+
+# --- URL de Configuración ---
+GSHEET_URL = "https://docs.google.com/spreadsheets/d/e/2PACX-1vTOEpNlhuiq7ibLw3LYuhP4medT5zdf0GgytMyUiD9px600IaRMwqgIjdMsVk8xP8paEH56Hpj4Yh2K/pub?gid=805865158&single=true&output=csv"
+
+# Tiempo máximo de conexión y de lectura de la descarga (segundos)
+TIMEOUT_DESCARGA = (3.05, 10)
+
+# Copia local de la última configuración válida
+SNAPSHOT_POR_DEFECTO = os.path.join(os.path.expanduser("~"), ".cache", "gemelo", "config_snapshot.json")
+
+
+# Convierte el texto CSV de la hoja en el diccionario de configuración.
+# on_aviso(mensaje) se llama por cada parámetro que no se pudo procesar.
+def leer_config_csv(csv_data, on_aviso=None):
+    import pandas as pd
+
+    df = pd.read_csv(io.StringIO(csv_data), usecols=["Parametro", "Valor"])
+    df = df.dropna(subset=["Parametro"])
+    df = df.set_index("Parametro")
+    config_dict = df["Valor"].to_dict()
+
+    processed_config = {}
+    for key, value in config_dict.items():
+        try:
+            key = key.strip()
+            if not key: continue
+            if isinstance(value, str):
+                value_str = value.strip()
+                if value_str.upper() == 'TRUE':
+                    processed_config[key] = True
+                elif value_str.upper() == 'FALSE':
+                    processed_config[key] = False
+                elif key == 'fecha_inicio':
+                    try:
+                        processed_config[key] = datetime.datetime.strptime(value_str, '%Y-%m-%d').date()
+                    except ValueError:
+                        processed_config[key] = datetime.datetime.strptime(value_str, '%d/%m/%Y').date()
+                else:
+                    try:
+                        value_str_cleaned = value_str.replace(',', '.')
+                        float_val = float(value_str_cleaned)
+                        if float_val.is_integer():
+                            processed_config[key] = int(float_val)
+                        else:
+                            processed_config[key] = float_val
+                    except (ValueError, TypeError):
+                        processed_config[key] = value_str
+            else:
+                processed_config[key] = value
+        except Exception as e:
+            if on_aviso: on_aviso(f"Error procesando parámetro '{key}' (Valor: {value}). Error: {e}")
+            processed_config[key] = value
+
+    return processed_config
+
+
+# Descarga la hoja y devuelve (config, None) o (None, mensaje_de_error)
+def descargar_config(csv_url, on_aviso=None, timeout=TIMEOUT_DESCARGA):
+    import requests
+
+    try:
+        response = requests.get(csv_url, timeout=timeout)
+        response.raise_for_status()
+        csv_data = response.content.decode('utf-8')
+        return leer_config_csv(csv_data, on_aviso=on_aviso), None
+
+    except Exception as e:
+        return None, str(e)
+
+
+# Configuración de la hoja con copia local y refresco en segundo plano.
+# obtener() nunca espera a la red si hay copia local; refrescar() hace la petición
+# condicional y, si la hoja cambió y es válida, actualiza la memoria y la copia local.
+class FuenteConfig:
+    def __init__(self, csv_url, snapshot=SNAPSHOT_POR_DEFECTO, timeout=TIMEOUT_DESCARGA, intervalo=60):
+        self.csv_url = csv_url
+        self.snapshot = snapshot
+        self.timeout = timeout
+        self.intervalo = intervalo # Segundos entre comprobaciones de la hoja
+        self.config = None
+        self.origen = None # "hoja" | "copia local"
+        self.descargado = None # Fecha (ISO) de la versión en uso
+        self.error = None # Último error de descarga (la configuración en uso sigue siendo válida)
+        self.avisos = [] # Avisos del procesado de la versión en uso
+        self.version = 0 # Aumenta cada vez que cambia la configuración
+        self._etag = None; self._last_modified = None
+        self._ultima_comprobacion = 0.0
+        self._lock = threading.Lock()
+        self._refresco = threading.Lock() # Un solo refresco a la vez (ver refrescar)
+        self._hilo = None
+        self._leer_snapshot()
+
+    # Devuelve (config, error) sin esperar a la red salvo que no haya ninguna copia
+    def obtener(self):
+        if self.config is None:
+            self.refrescar()
+        else:
+            self.refrescar_en_segundo_plano()
+        if self.config is None:
+            return None, self.error
+        return dict(self.config), None
+
+    def refrescar_en_segundo_plano(self):
+        with self._lock:
+            if self._hilo is not None and self._hilo.is_alive(): return
+            if time.monotonic() - self._ultima_comprobacion < self.intervalo: return
+            self._hilo = threading.Thread(target=self.refrescar, name="refresco-config", daemon=True)
+            self._hilo.start()
+
+    # Petición condicional a la hoja. Devuelve True si la configuración cambió.
+    # Los refrescos (el del hilo y el de "Recargar") se ejecutan de uno en uno con _refresco:
+    # cada uno parte del ETag que dejó el anterior y la copia local siempre lleva el suyo.
+    # _lock protege el estado que leen obtener() y refrescar_en_segundo_plano().
+    def refrescar(self):
+        import requests
+
+        with self._refresco:
+            with self._lock:
+                self._ultima_comprobacion = time.monotonic()
+                cabeceras = {}
+                if self.config is not None:
+                    if self._etag: cabeceras["If-None-Match"] = self._etag
+                    if self._last_modified: cabeceras["If-Modified-Since"] = self._last_modified
+            try:
+                response = requests.get(self.csv_url, headers=cabeceras, timeout=self.timeout)
+                if response.status_code == 304:
+                    with self._lock: self.error = None
+                    return False
+                response.raise_for_status()
+                csv_data = response.content.decode('utf-8')
+                avisos = []
+                config = leer_config_csv(csv_data, on_aviso=avisos.append)
+                if not config:
+                    raise ValueError("La hoja no contiene parámetros")
+            except Exception as e:
+                with self._lock: self.error = str(e)
+                return False
+
+            with self._lock:
+                self.error = None
+                validadores = (response.headers.get("ETag"), response.headers.get("Last-Modified"))
+                cambio = config != self.config
+                if not cambio and validadores == (self._etag, self._last_modified): return False
+                self._etag, self._last_modified = validadores
+                if cambio:
+                    self.config = config; self.avisos = avisos
+                    self.origen = "hoja"; self.descargado = datetime.datetime.now().isoformat(timespec="seconds")
+                    self.version += 1
+                datos = {"url": self.csv_url, "csv": csv_data, "etag": self._etag, "last_modified": self._last_modified, "descargado": self.descargado}
+            self._escribir_snapshot(datos)
+            return cambio
+
+    def _leer_snapshot(self):
+        if not self.snapshot: return
+        try:
+            with open(self.snapshot, encoding="utf-8") as f:
+                datos = json.load(f)
+            if datos.get("url") != self.csv_url: return
+            avisos = []
+            config = leer_config_csv(datos["csv"], on_aviso=avisos.append)
+        except FileNotFoundError:
+            return
+        except Exception as e: # Copia dañada: se ignora y se descargará de nuevo
+            self.error = f"Copia local no válida: {e}"
+            return
+        if not config: return
+        self.config = config; self.avisos = avisos
+        self.origen = "copia local"; self.descargado = datos.get("descargado")
+        self._etag = datos.get("etag"); self._last_modified = datos.get("last_modified")
+        self.version += 1
+
+    def _escribir_snapshot(self, datos):
+        if not self.snapshot: return
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.snapshot)), exist_ok=True)
+            temporal = f"{self.snapshot}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temporal, "w", encoding="utf-8") as f:
+                json.dump(datos, f, ensure_ascii=False)
+            os.replace(temporal, self.snapshot) # Escritura atómica: la copia nunca queda a medias
+        except OSError as e:
+            with self._lock: self.error = f"No se pudo guardar la copia local: {e}"
+
+
+# --- LÍNEA DE COMANDOS (procesos por lotes) ---
+# Argumento -c/--config común a todos los main()
+def argumento_config(parser):
+    parser.add_argument("-c", "--config", help="CSV local 'Parametro,Valor' en lugar de la hoja de Google")
+
+
+# Lee el CSV indicado con -c o, si no hay, descarga la hoja. Si no se puede, termina con parser.error.
+def cargar_config_cli(parser, ruta):
+    if ruta:
+        try:
+            with open(ruta, encoding="utf-8") as f:
+                return leer_config_csv(f.read(), on_aviso=print)
+        except (OSError, ValueError) as e:
+            parser.error(f"Error al leer la configuración '{ruta}': {e}")
+    config, error = descargar_config(GSHEET_URL, on_aviso=print)
+    if error:
+        parser.error(f"Error al cargar la configuración: {error}")
+    return config
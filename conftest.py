@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+# Configuración base de las pruebas: una semana con los parámetros típicos de la hoja.
+import datetime
+
+import pytest
+
+CONFIG_BASE = dict(
+    duracion_simulacion=168, kg_iniciales_camara=50000, fecha_inicio=datetime.date(2025, 11, 3),
+    porcentaje_huesos=30, kg_pallet_huesos=1100, kg_pallet_carne=1250,
+    kg_iniciales_tunel_congelado=100000, kg_iniciales_tunel_frescos=80000, horas_restantes_congelacion=10,
+    d_inicio=6, d_cerdos=4000, d_velo=500, d_oee=85, d_peso=95, d_peso_despojos=8, d_extra_check=False,
+    d_inicio_extra=6, d_cerdos_extra=2000, d_peso_despojos_extra=8,
+    c_inicio=7, c_duracion=14, c_linea_0=2500, c_linea_1=2500, c_linea_2=2000, c_linea_3=2000,
+    c_linea_4=1500, c_linea_5=1500, c_linea_6=1000, c_extra_check=False, c_inicio_extra=7, c_duracion_extra=8, c_kg_extra=9000,
+    p_inicio=8, p_duracion=8, p_kg=3000, p_extra_check=False, p_inicio_extra=8, p_duracion_extra=6, p_kg_extra=2000,
+    f_inicio=5, f_duracion=10, f_kg_dia=80000, f_extra_check=False, f_inicio_extra=5, f_duracion_extra=6, f_kg_dia_extra=30000,
+    v_inicio=6, v_duracion=16, v_kg=8000, v_extra_check=False, v_inicio_extra=6, v_duracion_extra=10, v_kg_extra=6000,
+)
+
+
+@pytest.fixture
+def config_base():
+    return dict(CONFIG_BASE)
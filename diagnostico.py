@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+# --- DIAGNÓSTICO DE RENDIMIENTO ---
+# Tiempos por etapa y contadores de una simulación (y de su reproducción en la app), para
+# saber en qué se va el tiempo cuando algo va lento.
+#
+# Se activa pasando un Diagnostico: simulate(config, diagnostico=d). Sin él el motor no mide
+# nada (usa el despachador normal, sin comprobaciones extra por paso).
+#   Etapas del motor: horario, inventario inicial, camara, bucle tuneles (incluye cajas y
+#   vaciado), cajas (pasada 1), cajas (pasada 2), vaciado, historial
+#   Contadores: pasos_procesados, pasadas_reparto, tuneles_probados, lotes_creados,
+#   lotes_vaciados, lotes_partidos (vaciado parcial del primer lote), recalculos_afinidad, vaciados
+#   La app añade: simulacion, dataframe, grafico, tuneles_html, metricas, espera y los
+#   contadores fotogramas, cache_aciertos y cache_fallos.
+# on_etapa(nombre, segundos) se llama al cerrar cada medición (p. ej. para enviarla a un log).
+#
+# Ejemplo (una simulación con su diagnóstico en JSON):
+#   python diagnostico.py -c config.csv -o diagnostico.json
+import argparse
+import json
+import time
+from contextlib import contextmanager
+
+
+class Diagnostico:
+    def __init__(self, on_etapa=None):
+        self.tiempos = {} # Segundos acumulados por etapa
+        self.mediciones = {} # Veces que se midió cada etapa
+        self.contadores = {}
+        self.on_etapa = on_etapa
+        self._marca = None
+
+    def sumar(self, etapa, segundos, veces=1):
+        self.tiempos[etapa] = self.tiempos.get(etapa, 0.0) + segundos
+        self.mediciones[etapa] = self.mediciones.get(etapa, 0) + veces
+        if self.on_etapa: self.on_etapa(etapa, segundos)
+
+    def contar(self, contador, n=1):
+        self.contadores[contador] = self.contadores.get(contador, 0) + n
+
+    # with d.etapa("grafico"): ...
+    @contextmanager
+    def etapa(self, nombre):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.sumar(nombre, time.perf_counter() - inicio)
+
+    # Cronómetro por vueltas: iniciar() y luego vuelta(etapa) al acabar cada etapa seguida
+    def iniciar(self):
+        self._marca = time.perf_counter()
+
+    def vuelta(self, etapa):
+        ahora = time.perf_counter()
+        self.sumar(etapa, ahora - self._marca)
+        self._marca = ahora
+
+    # Suma las mediciones de otro diagnóstico (p. ej. el de una simulación en segundo plano, ya acabada)
+    def combinar(self, otro):
+        for etapa, segundos in otro.tiempos.items():
+            self.tiempos[etapa] = self.tiempos.get(etapa, 0.0) + segundos
+            self.mediciones[etapa] = self.mediciones.get(etapa, 0) + otro.mediciones[etapa]
+        for contador, n in otro.contadores.items(): self.contar(contador, n)
+
+    def limpiar(self):
+        self.tiempos.clear(); self.mediciones.clear(); self.contadores.clear()
+
+    # Filas (etapa, ms, mediciones, ms por medición), de la etapa más lenta a la más rápida
+    def filas(self):
+        return [(etapa, segundos * 1000, self.mediciones[etapa], segundos * 1000 / self.mediciones[etapa])
+                for etapa, segundos in sorted(self.tiempos.items(), key=lambda e: -e[1])]
+
+    def a_dict(self):
+        return {'tiempos_s': dict(self.tiempos), 'mediciones': dict(self.mediciones), 'contadores': dict(self.contadores)}
+
+    def a_json(self):
+        return json.dumps(self.a_dict(), ensure_ascii=False, indent=2)
+
+    def guardar_json(self, fichero):
+        with open(fichero, "w", encoding="utf-8") as f:
+            f.write(self.a_json())
+
+    def texto(self):
+        lineas = [f"{etapa:<22} {ms:10.2f} ms  {veces:8d} x  {ms_vez:9.4f} ms/vez" for etapa, ms, veces, ms_vez in self.filas()]
+        lineas += [f"{contador:<22} {valor:10d}" for contador, valor in sorted(self.contadores.items())]
+        return "\n".join(lineas)
+
+
+def main(argv=None):
+    from configuracion import argumento_config, cargar_config_cli
+    from motor import simulate
+
+    parser = argparse.ArgumentParser(description="Diagnóstico de rendimiento de una simulación del gemelo digital")
+    argumento_config(parser)
+    parser.add_argument("-o", "--salida", help="Fichero JSON con tiempos y contadores")
+    parser.add_argument("--sin-tuneles", action="store_true", help="No registrar el estado por túnel (como los procesos por lotes)")
+    args = parser.parse_args(argv)
+
+    config = cargar_config_cli(parser, args.config)
+
+    diagnostico = Diagnostico()
+    with diagnostico.etapa("simulacion"):
+        simulate(config, registrar_tuneles=not args.sin_tuneles, diagnostico=diagnostico)
+    print(diagnostico.texto())
+    if args.salida:
+        diagnostico.guardar_json(args.salida)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+# --- ESCENARIOS EN LOTE ("¿Qué pasa si...?") ---
+# Ejecuta muchas variantes de la configuración de la hoja en paralelo (un proceso
+# por núcleo) y devuelve una fila resumen por escenario.
+#
+# Ejemplo desde la línea de comandos:
+#   python escenarios.py -r v_kg=6000,8000,10000 -r c_inicio=5,6,7 -o escenarios.csv
+#   python escenarios.py -r c_linea_7=0,1500,3000      (añadir una "Línea 8" de cajas)
+#   python escenarios.py -r v_kg=6000,8000 --calentamiento 72   (bifurcar tras 3 días comunes)
+#   python escenarios.py -r v_kg=6000,8000 --parquet resultados/ --detalle-tuneles
+import argparse
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from motor import simulate
+
+# Configuración base (y punto de control común, si hay) compartidos por los procesos del pool
+# (se envían una vez por proceso)
+_config_base = None
+_desde = None
+_salida_parquet = None; _detalle_tuneles = False
+
+
+# Producto cartesiano de una rejilla {clave: [valores]} -> lista de diccionarios de cambios
+def expandir_rejilla(rejilla):
+    claves = list(rejilla)
+    return [dict(zip(claves, valores)) for valores in itertools.product(*(rejilla[k] for k in claves))]
+
+
+# Fila resumen de un resultado del motor
+def resumir_resultado(resultado):
+    capacidad_pallets = sum(t.max_pallets for t in resultado.tuneles)
+    pico_pallets = resultado.pico('pallets_tuneles')
+    camara = resultado.columnas['Kg Cámara Refrigerado']
+    return {
+        'Pico Kg Congelar Fuera': resultado.pico('Kg Congelar Fuera'),
+        'Pico Kg en Túneles': resultado.pico('Kg en Túneles (Total)'),
+        'Pico Palés en Túneles': pico_pallets,
+        'Pico Ocupación Túneles (%)': (pico_pallets / capacidad_pallets * 100) if capacidad_pallets > 0 else 0.0,
+        'Horas Saturación Túneles': resultado.horas_saturacion(),
+        'Kg Cámara Final': float(camara[-1]) if len(camara) else 0.0,
+    }
+
+
+def _iniciar_proceso(config_base, desde=None, salida_parquet=None, detalle_tuneles=False):
+    global _config_base, _desde, _salida_parquet, _detalle_tuneles
+    _config_base = config_base; _desde = desde
+    _salida_parquet = salida_parquet; _detalle_tuneles = detalle_tuneles
+
+
+def _ejecutar_escenario(cambios, escenario=0, escritor=None):
+    config = dict(_config_base)
+    config.update(cambios)
+    try:
+        resultado = simulate(config, registrar_tuneles=escritor is not None and escritor.detalle_tuneles, desde=_desde)
+        fila = resumir_resultado(resultado)
+        fila['Error'] = None
+    except Exception as e:
+        return {'Error': str(e)}
+    if escritor is not None: escritor.escribir(resultado, escenario) # Un fallo al escribir sí detiene el lote
+    return fila
+
+
+# Escenarios consecutivos desde el número 'primero'; con salida Parquet, cada lote escribe su parte
+def _ejecutar_lote(primero, lote):
+    if not _salida_parquet:
+        return [_ejecutar_escenario(c) for c in lote]
+    from exportacion import EscritorParquet
+
+    with EscritorParquet(_salida_parquet, parte=f"parte-{primero:08d}", detalle_tuneles=_detalle_tuneles) as escritor:
+        return [_ejecutar_escenario(c, primero + k, escritor) for k, c in enumerate(lote)]
+
+
+# Ejecuta cada diccionario de cambios sobre config_base y devuelve un DataFrame
+# con los cambios aplicados más las métricas de resumir_resultado (mismo orden).
+# desde=PuntoControl: todos los escenarios continúan desde ese estado común (p. ej. un
+# calentamiento simulate(config_base, hasta_hora=H)); las métricas cubren lo simulado después.
+# salida_parquet=carpeta: además escribe historial, resumen diario y (con detalle_tuneles)
+# el detalle por túnel de cada escenario según se calcula (ver exportacion.py); la columna
+# 'escenario' es la posición en la lista (la fila del DataFrame devuelto).
+def ejecutar_escenarios(config_base, escenarios, procesos=None, desde=None, salida_parquet=None, detalle_tuneles=False):
+    import pandas as pd
+
+    escenarios = list(escenarios)
+    procesos = procesos or os.cpu_count() or 1
+    opciones = (desde, salida_parquet, detalle_tuneles)
+    if procesos == 1 or len(escenarios) <= 1:
+        _iniciar_proceso(config_base, *opciones)
+        filas = _ejecutar_lote(0, escenarios)
+    else:
+        # Lotes grandes para repartir el coste de comunicación entre procesos
+        chunksize = max(1, len(escenarios) // (procesos * 4))
+        primeros = range(0, len(escenarios), chunksize)
+        with ProcessPoolExecutor(max_workers=procesos, initializer=_iniciar_proceso, initargs=(dict(config_base), *opciones)) as pool:
+            filas = [fila for lote in pool.map(_ejecutar_lote, primeros, [escenarios[i:i + chunksize] for i in primeros]) for fila in lote]
+
+    return pd.DataFrame([dict(cambios, **fila) for cambios, fila in zip(escenarios, filas)])
+
+
+# "clave=v1,v2,v3" -> ("clave", [v1, v2, v3]) con los mismos tipos que la hoja
+def _leer_opcion_rejilla(texto):
+    clave, _, valores = texto.partition("=")
+    lista = []
+    for v in valores.split(","):
+        v = v.strip()
+        if v.upper() in ("TRUE", "FALSE"):
+            lista.append(v.upper() == "TRUE")
+            continue
+        try:
+            num = float(v)
+            lista.append(int(num) if num.is_integer() else num)
+        except ValueError:
+            lista.append(v)
+    return clave.strip(), lista
+
+
+def main(argv=None):
+    from configuracion import argumento_config, cargar_config_cli
+
+    parser = argparse.ArgumentParser(description="Escenarios en lote del gemelo digital")
+    parser.add_argument("-r", "--rejilla", action="append", default=[], help="clave=v1,v2,... (se puede repetir)")
+    argumento_config(parser)
+    parser.add_argument("-p", "--procesos", type=int, default=None, help="Procesos (por defecto, todos los núcleos)")
+    parser.add_argument("-o", "--salida", help="Fichero CSV de salida")
+    parser.add_argument("--calentamiento", type=float, default=None, help="Horas simuladas una sola vez con la configuración base antes de bifurcar")
+    parser.add_argument("--parquet", help="Carpeta donde escribir historial, resumen diario y escenarios en Parquet")
+    parser.add_argument("--detalle-tuneles", action="store_true", help="Con --parquet, incluir el detalle por paso y túnel")
+    args = parser.parse_args(argv)
+
+    config_base = cargar_config_cli(parser, args.config)
+
+    rejilla = dict(_leer_opcion_rejilla(r) for r in args.rejilla)
+    desde = None
+    if args.calentamiento:
+        desde = simulate(config_base, registrar_tuneles=False, hasta_hora=args.calentamiento).punto_control
+    df = ejecutar_escenarios(config_base, expandir_rejilla(rejilla), procesos=args.procesos, desde=desde,
+                             salida_parquet=args.parquet, detalle_tuneles=args.detalle_tuneles)
+    if args.parquet:
+        os.makedirs(args.parquet, exist_ok=True)
+        df.rename_axis('escenario').reset_index().to_parquet(os.path.join(args.parquet, "escenarios.parquet"), index=False)
+    if args.salida:
+        df.to_csv(args.salida, index=False)
+    print(df.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+# --- EXPORTACIÓN DE RESULTADOS (Parquet) ---
+# Escribe los resultados del motor en tres tablas Parquet, cada una en su carpeta
+# (un "dataset": pd.read_parquet(carpeta) o pyarrow.dataset leen todas las partes):
+#   historial/       una fila por paso (mismas columnas que ResultadoSimulacion.columnas)
+#   resumen_diario/  una fila por fin de día
+#   tuneles/         una fila por paso y túnel (palés, palés huesos/carne, kg, afinidad)
+# Todas llevan la columna 'escenario' para distinguir las simulaciones de un mismo lote.
+#
+# Los resultados se escriben según llegan (EscritorParquet.escribir) y se acumulan solo
+# hasta completar un grupo de filas, así que un barrido con millones de filas no necesita
+# tenerlas todas en memoria ni repetir las simulaciones para analizarlas después.
+import os
+
+from motor import COLUMNAS_INVENTARIO
+from tuneles import NOMBRES_AFINIDAD
+
+TABLAS = ("historial", "resumen_diario", "tuneles")
+FILAS_POR_GRUPO = 128 * 1024
+
+# Afinidad como diccionario: índice = código + 2 (códigos de -2 a 1)
+_AFINIDADES = [NOMBRES_AFINIDAD[codigo] for codigo in sorted(NOMBRES_AFINIDAD)]
+
+
+def _fechas(resultado):
+    import numpy as np
+
+    minutos = (resultado.columnas['paso'] - 1) * 60 // resultado.pasos_por_hora
+    return (np.datetime64(resultado.inicio, 'm') + minutos.astype('timedelta64[m]')).astype('datetime64[s]')
+
+
+def tabla_historial(resultado, escenario=0):
+    import numpy as np
+    import pyarrow as pa
+
+    columnas = {'escenario': np.full(resultado.filas, escenario, dtype=np.int64), 'datetime': _fechas(resultado)}
+    columnas.update(resultado.columnas)
+    return pa.table(columnas)
+
+
+def tabla_resumen_diario(resultado, escenario=0):
+    import pyarrow as pa
+
+    filas = resultado.resumen_diario
+    columnas = {'escenario': pa.array([escenario] * len(filas), pa.int64()), 'Día': pa.array([f['Día'] for f in filas], pa.string())}
+    for columna in COLUMNAS_INVENTARIO:
+        columnas[columna] = pa.array([float(f[columna]) for f in filas], pa.float64())
+    return pa.table(columnas)
+
+
+# Formato largo (paso x túnel); None si la simulación no registró los túneles
+def tabla_tuneles(resultado, escenario=0):
+    import numpy as np
+    import pyarrow as pa
+
+    if resultado.estados_tuneles is None: return None
+    filas, n_tuneles = resultado.afinidades_tuneles.shape
+    estados = resultado.estados_tuneles.reshape(filas * n_tuneles, 4)
+    nombres = pa.array([t.name for t in resultado.tuneles], pa.string())
+    return pa.table({
+        'escenario': np.full(filas * n_tuneles, escenario, dtype=np.int64),
+        'paso': np.repeat(resultado.columnas['paso'], n_tuneles),
+        'datetime': np.repeat(_fechas(resultado), n_tuneles),
+        'tunel': pa.DictionaryArray.from_arrays(np.tile(np.arange(n_tuneles, dtype=np.int32), filas), nombres),
+        'pallets': estados[:, 0], 'pallets_huesos': estados[:, 1], 'pallets_carne': estados[:, 2], 'kg': estados[:, 3],
+        'afinidad': pa.DictionaryArray.from_arrays(resultado.afinidades_tuneles.reshape(-1).astype(np.int32) + 2, pa.array(_AFINIDADES, pa.string())),
+    })
+
+
+# Escritor por partes: cada proceso de un lote escribe su propio fichero <parte>.parquet
+# en cada carpeta, y las partes juntas forman el dataset.
+class EscritorParquet:
+    def __init__(self, directorio, parte="parte-0", filas_por_grupo=FILAS_POR_GRUPO, detalle_tuneles=True):
+        self.directorio = directorio
+        self.parte = parte
+        self.filas_por_grupo = filas_por_grupo
+        self.detalle_tuneles = detalle_tuneles
+        self._escritores = {}
+        self._pendientes = {tabla: [] for tabla in TABLAS}
+        self._filas_pendientes = dict.fromkeys(TABLAS, 0)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    def escribir(self, resultado, escenario=0):
+        self._anadir("historial", tabla_historial(resultado, escenario))
+        self._anadir("resumen_diario", tabla_resumen_diario(resultado, escenario))
+        if self.detalle_tuneles:
+            tabla = tabla_tuneles(resultado, escenario)
+            if tabla is not None: self._anadir("tuneles", tabla)
+
+    def cerrar(self):
+        for tabla in TABLAS: self._volcar(tabla)
+        for escritor in self._escritores.values(): escritor.close()
+        self._escritores.clear()
+
+    def _anadir(self, tabla, datos):
+        self._pendientes[tabla].append(datos)
+        self._filas_pendientes[tabla] += datos.num_rows
+        if self._filas_pendientes[tabla] >= self.filas_por_grupo: self._volcar(tabla)
+
+    def _volcar(self, tabla):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        pendientes = self._pendientes[tabla]
+        if not pendientes: return
+        datos = pa.concat_tables(pendientes).combine_chunks() if len(pendientes) > 1 else pendientes[0]
+        escritor = self._escritores.get(tabla)
+        if escritor is None:
+            carpeta = os.path.join(self.directorio, tabla)
+            os.makedirs(carpeta, exist_ok=True)
+            escritor = self._escritores[tabla] = pq.ParquetWriter(os.path.join(carpeta, f"{self.parte}.parquet"), datos.schema)
+        escritor.write_table(datos, row_group_size=self.filas_por_grupo)
+        pendientes.clear(); self._filas_pendientes[tabla] = 0
+
+
+# Los tres ficheros de un único resultado en una carpeta
+def exportar_resultado(resultado, directorio, escenario=0):
+    with EscritorParquet(directorio) as escritor:
+        escritor.escribir(resultado, escenario)
+
+
+# Historial de un resultado como bytes Parquet (descarga desde la app)
+def historial_parquet(resultado):
+    import io
+
+    import pyarrow.parquet as pq
+
+    salida = io.BytesIO()
+    pq.write_table(tabla_historial(resultado), salida)
+    return salida.getvalue()
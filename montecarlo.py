@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+# --- MONTE CARLO (OEE, cerdos, peso canal y % huesos estocásticos) ---
+# Muestrea cada día de cada réplica desde distribuciones configurables, ejecuta las
+# réplicas en paralelo con el motor y resume el riesgo con percentiles P50/P90/P99.
+#
+# Ejemplo:
+#   python montecarlo.py -n 10000 -c config.csv -d d_oee=normal,85,6 -d porcentaje_huesos=uniforme,25,35
+import argparse
+
+import numpy as np
+
+from escenarios import ejecutar_escenarios
+from motor import calcular_parametros
+
+PERCENTILES = (50, 90, 99)
+METRICAS = ('Pico Kg Congelar Fuera', 'Horas Saturación Túneles', 'Pico Ocupación Túneles (%)')
+
+# Límites físicos de cada clave (los valores muestreados se recortan a este rango)
+LIMITES = {
+    "d_oee": (1, 100),
+    "porcentaje_huesos": (0, 100),
+    "d_cerdos": (0, None),
+    "d_peso": (1, None),
+    "d_peso_despojos": (0, None),
+    "d_velo": (0, None),
+}
+CLAVES_ENTERAS = ("d_cerdos",)
+
+
+# Dispersión por defecto alrededor de los valores de la hoja
+def distribuciones_por_defecto(config):
+    return {
+        "d_oee": ("normal", config.get("d_oee", 0), 5.0),
+        "d_cerdos": ("normal", config.get("d_cerdos", 0), 0.05 * config.get("d_cerdos", 0)),
+        "d_peso": ("normal", config.get("d_peso", 0), 0.03 * config.get("d_peso", 0)),
+        "porcentaje_huesos": ("normal", config.get("porcentaje_huesos", 50), 2.0),
+    }
+
+
+# distribucion: ("normal", media, desviacion) | ("uniforme", minimo, maximo)
+#               | ("triangular", minimo, moda, maximo) | ("fijo", valor)
+def muestrear(distribucion, rng, tamano):
+    tipo, *args = distribucion
+    if tipo == "normal": return rng.normal(args[0], args[1], tamano)
+    if tipo == "uniforme": return rng.uniform(args[0], args[1], tamano)
+    if tipo == "triangular": return rng.triangular(args[0], args[1], args[2], tamano)
+    if tipo == "fijo": return np.full(tamano, float(args[0]))
+    raise ValueError(f"Distribución desconocida: '{tipo}'")
+
+
+# Genera los valores por día de todas las réplicas de una vez: {clave: array (n_replicas, n_dias)}
+def muestrear_replicas(distribuciones, n_replicas, n_dias, semilla=None):
+    rng = np.random.default_rng(semilla)
+    muestras = {}
+    for clave, distribucion in distribuciones.items():
+        valores = muestrear(distribucion, rng, (n_replicas, n_dias))
+        minimo, maximo = LIMITES.get(clave, (None, None))
+        if minimo is not None or maximo is not None:
+            valores = np.clip(valores, minimo, maximo)
+        if clave in CLAVES_ENTERAS:
+            valores = np.rint(valores)
+        muestras[clave] = valores
+    return muestras
+
+
+# Ejecuta n_replicas y devuelve un DataFrame con una fila por réplica
+def ejecutar_montecarlo(config, n_replicas, distribuciones=None, semilla=None, procesos=None):
+    if distribuciones is None:
+        distribuciones = distribuciones_por_defecto(config)
+    # Un valor por día simulado (el calendario y los días extra cuentan)
+    n_dias = (calcular_parametros(config)["duracion_total_real"] + 23) // 24
+    muestras = muestrear_replicas(distribuciones, n_replicas, n_dias, semilla=semilla)
+
+    escenarios = [{"por_dia": {clave: valores[i].tolist() for clave, valores in muestras.items()}} for i in range(n_replicas)]
+    df = ejecutar_escenarios(config, escenarios, procesos=procesos)
+    return df.drop(columns=["por_dia"])
+
+
+# Percentiles de las métricas de riesgo (filas P50/P90/P99), probabilidad de que cada métrica
+# supere 0 y número de réplicas descartadas por error (no entran en los percentiles)
+def resumir_montecarlo(df_replicas, percentiles=PERCENTILES):
+    import pandas as pd
+
+    fallidas = df_replicas['Error'].notna() if 'Error' in df_replicas else pd.Series(False, index=df_replicas.index)
+    if fallidas.all():
+        error = df_replicas['Error'].dropna().iloc[0] if len(df_replicas) else "no hay réplicas"
+        raise ValueError(f"Ninguna réplica terminó sin error: {error}")
+    validas = df_replicas[~fallidas]
+
+    resumen = {}
+    for metrica in METRICAS:
+        valores = validas[metrica].to_numpy(dtype=float)
+        resumen[metrica] = np.percentile(valores, percentiles)
+    df = pd.DataFrame(resumen, index=[f"P{p}" for p in percentiles])
+    df.loc["Prob. > 0 (%)"] = pd.Series({metrica: (validas[metrica] > 0).mean() * 100 for metrica in ('Pico Kg Congelar Fuera', 'Horas Saturación Túneles')})
+    df.loc["Réplicas con error"] = int(fallidas.sum())
+    return df
+
+
+# "clave=tipo,a,b[,c]" -> (clave, (tipo, a, b[, c]))
+def _leer_opcion_distribucion(texto):
+    clave, _, resto = texto.partition("=")
+    tipo, *args = [x.strip() for x in resto.split(",")]
+    return clave.strip(), (tipo, *[float(a) for a in args])
+
+
+def main(argv=None):
+    import time
+
+    from configuracion import argumento_config, cargar_config_cli
+
+    parser = argparse.ArgumentParser(description="Monte Carlo del gemelo digital")
+    parser.add_argument("-n", "--replicas", type=int, default=1000)
+    parser.add_argument("-d", "--distribucion", action="append", default=[], help="clave=tipo,a,b[,c] (normal, uniforme, triangular, fijo)")
+    argumento_config(parser)
+    parser.add_argument("-s", "--semilla", type=int, default=None)
+    parser.add_argument("-p", "--procesos", type=int, default=None, help="Procesos (por defecto, todos los núcleos)")
+    parser.add_argument("-o", "--salida", help="CSV con una fila por réplica")
+    args = parser.parse_args(argv)
+
+    config = cargar_config_cli(parser, args.config)
+
+    distribuciones = distribuciones_por_defecto(config)
+    distribuciones.update(_leer_opcion_distribucion(d) for d in args.distribucion)
+
+    inicio = time.perf_counter()
+    df = ejecutar_montecarlo(config, args.replicas, distribuciones, semilla=args.semilla, procesos=args.procesos)
+    print(f"{args.replicas} réplicas en {time.perf_counter() - inicio:.1f} s")
+    if args.salida:
+        df.to_csv(args.salida, index=False)
+    print(resumir_montecarlo(df).to_string())
+
+
+if __name__ == "__main__":
+    main()
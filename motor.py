@@ -0,0 +1,886 @@
+# -*- coding: utf-8 -*-
+# --- MOTOR DE SIMULACIÓN (sin Streamlit, sin esperas) ---
+# Ejecuta el mismo bucle horario que la pestaña de simulación (despiece ->
+# cajas/placas/fresco -> vaciado) sobre un diccionario de configuración con las
+# mismas claves que produce load_config_from_gsheet / st.session_state.
+# Se puede importar desde procesos por lotes y pruebas: no dibuja nada.
+import datetime
+import math
+from array import array
+from collections import ChainMap
+
+import numpy as np
+
+from tuneles import CARNE, CODIGOS_PRODUCTO, CONGELADO, HORAS_CONGELACION, HUESOS, NOMBRES_AFINIDAD, DespachadorInstrumentado, DespachadorTuneles, Tunnel
+
+# Flota por defecto: (nombre, max_pallets, rows, cols[, horas_congelacion, productos])
+TUNELES_POR_DEFECTO = [
+    ("CC037", 44, 11, 4), ("CC038", 44, 11, 4),
+    ("CC058", 44, 11, 4), ("CC059", 55, 11, 5),
+    ("CC062", 168, 21, 8),
+]
+
+# Columnas del historial horario (mismos nombres que el gráfico y la tabla resumen)
+COLUMNAS_INVENTARIO = ['Kg Cámara Refrigerado', 'Kg en Túneles (Total)', 'Kg Congelar Fuera']
+# Todas las columnas numéricas del historial con su tipo (códigos de array / numpy)
+COLUMNAS_HISTORIAL = {
+    'paso': 'q', 'es_dia_extra': '?',
+    'Kg Cámara Refrigerado': 'd', 'Kg en Túneles (Total)': 'd', 'Kg Congelar Fuera': 'd',
+    'kg_total_congelados': 'd', 'kg_procesados_despiece_hoy': 'd', 'objetivo_despiece_dia': 'd',
+    'kg_cargados_fresco_hoy': 'd', 'objetivo_fresco_dia': 'd', 'pallets_tuneles': 'd',
+}
+
+# Claves que pueden variar día a día con config["por_dia"] = {clave: [valor_día_1, valor_día_2, ...]}
+# (si la lista es más corta que la simulación, se repite su último valor)
+CLAVES_POR_DIA = ("d_cerdos", "d_velo", "d_oee", "d_peso", "d_peso_despojos", "d_cerdos_extra", "d_peso_despojos_extra", "porcentaje_huesos")
+
+# Claves de la configuración que lee el motor (el resto, p. ej. las de la UI, no cambian el resultado)
+PREFIJOS_ENTRADA = ("d_", "c_", "p_", "f_", "v_", "t_")
+CLAVES_ENTRADA = (
+    "duracion_simulacion", "fecha_inicio", "paso_minutos", "por_dia", "porcentaje_huesos",
+    "kg_pallet_huesos", "kg_pallet_carne", "kg_iniciales_camara",
+    "kg_iniciales_tunel_congelado", "kg_iniciales_tunel_frescos", "horas_restantes_congelacion",
+    "calendario", "dias_parados", "festivos",
+)
+
+
+# Subconjunto de la configuración que determina el resultado de simulate()
+def config_entrada(config):
+    return {k: v for k, v in config.items() if k in CLAVES_ENTRADA or k.startswith(PREFIJOS_ENTRADA)}
+
+
+def crear_tuneles(definiciones=TUNELES_POR_DEFECTO):
+    return [Tunnel(*d) for d in definiciones]
+
+
+# Flota de túneles de la hoja: un bloque de claves numeradas por túnel (t_nombre_0, t_nombre_1, ...)
+#   t_nombre_<i>, t_pales_<i>                  obligatorias
+#   t_filas_<i>, t_columnas_<i>                 rejilla del dibujo (por defecto 4 columnas)
+#   t_horas_huesos_<i>, t_horas_carne_<i>       horas de congelación (por defecto 18 / 33)
+#   t_productos_<i>                             "Huesos", "Carne" o "Huesos,Carne" (por defecto ambos)
+# Sin ninguna clave t_nombre_<i> se usa TUNELES_POR_DEFECTO.
+def definiciones_tuneles(config):
+    indices = sorted(int(k[len("t_nombre_"):]) for k in config if k.startswith("t_nombre_") and k[len("t_nombre_"):].isdigit())
+    if not indices:
+        return TUNELES_POR_DEFECTO
+    definiciones = []; nombres = set()
+    for i in indices:
+        nombre = str(config[f"t_nombre_{i}"]).strip()
+        max_pallets = config.get(f"t_pales_{i}", 0)
+        if not nombre or nombre in nombres:
+            raise ValueError(f"t_nombre_{i}: nombre de túnel vacío o repetido ('{nombre}')")
+        if not isinstance(max_pallets, (int, float)) or max_pallets <= 0:
+            raise ValueError(f"t_pales_{i}: el túnel '{nombre}' necesita un número de palés > 0")
+        cols = int(config.get(f"t_columnas_{i}", 4)) or 4
+        rows = int(config.get(f"t_filas_{i}", 0)) or math.ceil(max_pallets / cols)
+        horas = (config.get(f"t_horas_huesos_{i}", HORAS_CONGELACION[HUESOS]), config.get(f"t_horas_carne_{i}", HORAS_CONGELACION[CARNE]))
+        productos = []
+        for texto in str(config.get(f"t_productos_{i}", "Huesos,Carne")).replace("+", ",").split(","):
+            producto = CODIGOS_PRODUCTO.get(texto.strip().capitalize())
+            if producto not in (HUESOS, CARNE):
+                raise ValueError(f"t_productos_{i}: producto desconocido '{texto.strip()}' (Huesos, Carne)")
+            productos.append(producto)
+        nombres.add(nombre)
+        definiciones.append((nombre, max_pallets, rows, cols, horas, tuple(productos)))
+    return definiciones
+
+
+# Suma todas las líneas de cajas presentes (c_linea_0, c_linea_1, ...), no solo las 7 de la UI
+def kg_hora_cajas_total(config):
+    return sum(v for k, v in config.items() if k.startswith("c_linea_") and k[len("c_linea_"):].isdigit())
+
+
+# --- CÁLCULOS PRELIMINARES ---
+# Ritmos de despiece y reparto huesos/carne (lo único que cambia con "por_dia")
+def _parametros_despiece(config):
+    p = {}
+    p["pct_huesos"] = config.get("porcentaje_huesos", 50)
+    v_real = config.get("d_velo", 0) * (config.get("d_oee", 0) / 100.0)
+    kg_canal_por_cerdo = config.get("d_peso", 0)
+    kg_despojos_por_cerdo = config.get("d_peso_despojos", 0)
+    p["kg_por_hora_despiece"] = v_real * (kg_canal_por_cerdo + kg_despojos_por_cerdo)
+    p["kg_por_dia_canal_total"] = config.get("d_cerdos", 0) * kg_canal_por_cerdo
+    p["kg_por_dia_despojos_total"] = config.get("d_cerdos", 0) * kg_despojos_por_cerdo
+    p["kg_por_dia_despiece_total"] = p["kg_por_dia_canal_total"] + p["kg_por_dia_despojos_total"]
+    p["horas_trabajo_despiece"] = (config.get("d_cerdos", 0) / v_real) if v_real > 0 else 0
+    p["fin_despiece"] = config.get("d_inicio", 0) + p["horas_trabajo_despiece"]
+
+    # Día extra (el peso de la canal se asume igual al de los días normales)
+    kg_despojos_por_cerdo_extra = config.get("d_peso_despojos_extra", 0)
+    p["kg_por_hora_despiece_extra"] = v_real * (kg_canal_por_cerdo + kg_despojos_por_cerdo_extra)
+    p["kg_por_dia_despiece_total_extra"] = config.get("d_cerdos_extra", 0) * (kg_canal_por_cerdo + kg_despojos_por_cerdo_extra)
+    p["fin_despiece_extra"] = config.get("d_inicio_extra", 0) + ((config.get("d_cerdos_extra", 0) / v_real) if v_real > 0 else 0)
+    return p
+
+
+# Devuelve los ritmos y horarios derivados de la configuración (también los usa el resumen de la UI)
+def calcular_parametros(config):
+    p = _parametros_despiece(config)
+    p["kg_hora_cajas_total"] = kg_hora_cajas_total(config)
+    p["kg_hora_fresco"] = (config.get("f_kg_dia", 0) / config.get("f_duracion", 1)) if config.get("f_duracion", 0) > 0 else 0
+    p["fin_cajas"] = config.get("c_inicio", 0) + config.get("c_duracion", 0)
+    p["fin_placas"] = config.get("p_inicio", 0) + config.get("p_duracion", 0)
+    p["fin_fresco"] = config.get("f_inicio", 0) + config.get("f_duracion", 0)
+    p["fin_vaciado"] = config.get("v_inicio", 0) + config.get("v_duracion", 0)
+
+    p["fin_cajas_extra"] = config.get("c_inicio_extra", 0) + config.get("c_duracion_extra", 0)
+    p["fin_placas_extra"] = config.get("p_inicio_extra", 0) + config.get("p_duracion_extra", 0)
+    p["kg_hora_fresco_extra"] = (config.get("f_kg_dia_extra", 0) / config.get("f_duracion_extra", 1)) if config.get("f_duracion_extra", 0) > 0 else 0
+    p["fin_fresco_extra"] = config.get("f_inicio_extra", 0) + config.get("f_duracion_extra", 0)
+    p["fin_vaciado_extra"] = config.get("v_inicio_extra", 0) + config.get("v_duracion_extra", 0)
+
+    dias = dias_calendario(config)
+    if dias is not None:
+        duracion_total_real = 24 * len(dias)
+    else:
+        duracion_total_real = config.get("duracion_simulacion", 0)
+        if any(config.get(k, False) for k in ["d_extra_check", "c_extra_check", "p_extra_check", "f_extra_check", "v_extra_check"]):
+            duracion_total_real += 24
+    p["duracion_total_real"] = duracion_total_real
+    return p
+
+
+# Ritmos que dependen de las claves diarias (mismo orden que se desempaqueta en simulate)
+def _ritmos_dia(p):
+    return (p["pct_huesos"], p["kg_por_hora_despiece"], p["kg_por_dia_despiece_total"], p["fin_despiece"],
+            p["kg_por_hora_despiece_extra"], p["kg_por_dia_despiece_total_extra"], p["fin_despiece_extra"])
+
+
+def calcular_ritmos_por_dia(config, n_dias):
+    por_dia = config.get("por_dia") or {}
+    no_soportadas = set(por_dia) - set(CLAVES_POR_DIA)
+    if no_soportadas:
+        raise ValueError(f"Claves no soportadas en 'por_dia': {sorted(no_soportadas)}")
+    ritmos = []
+    for dia in range(n_dias):
+        valores_dia = {k: v[min(dia, len(v) - 1)] for k, v in por_dia.items() if len(v) > 0}
+        ritmos.append(_ritmos_dia(_parametros_despiece(ChainMap(valores_dia, config))))
+    return ritmos
+
+
+# --- PASO DE TIEMPO ---
+# config["paso_minutos"]: duración de un paso (60 = horario, como siempre). Debe dividir la hora.
+def pasos_por_hora(config):
+    paso_minutos = config.get("paso_minutos", 60) or 60
+    if paso_minutos <= 0 or 60 % paso_minutos != 0:
+        raise ValueError(f"paso_minutos debe dividir 60 (recibido: {paso_minutos})")
+    return 60 // paso_minutos
+
+
+# Ritmos diarios en unidades de paso: kg/h -> kg/paso y horas de fin -> pasos
+def _ritmos_en_pasos(ritmos, n):
+    pct, kg_h, total, fin, kg_h_extra, total_extra, fin_extra = ritmos
+    return (pct, kg_h / n, total, fin * n, kg_h_extra / n, total_extra, fin_extra * n)
+
+
+# --- CALENDARIO ---
+# Tipo de cada día: normal (horarios d_/c_/p_/f_/v_), extra (horarios *_extra de los procesos
+# con *_extra_check) o parado (sin turnos ni vaciado). Sin config["calendario"] se simulan
+# duracion_simulacion horas normales y, si hay algún *_extra_check, 24 horas extra detrás.
+#   calendario:    un tipo por día, lista o texto "N,N,N,N,N,P,P,E" (N normal, E extra, P parado);
+#                  fija la duración (24 h por día)
+#   dias_parados:  días de la semana sin actividad, p. ej. "sábado,domingo" (según fecha_inicio)
+#   festivos:      fechas sin actividad, "2025-12-25,2026-01-01" (o lista de fechas)
+NORMAL, EXTRA, PARADO = 0, 1, 2
+CODIGOS_TIPO_DIA = {"n": NORMAL, "normal": NORMAL, "e": EXTRA, "extra": EXTRA, "p": PARADO, "parado": PARADO, "festivo": PARADO}
+DIAS_SEMANA = {"lunes": 0, "martes": 1, "miércoles": 2, "miercoles": 2, "jueves": 3, "viernes": 4,
+               "sábado": 5, "sabado": 5, "domingo": 6}
+
+
+# Valor de la hoja como lista ("a, b; c" -> ["a", "b", "c"])
+def _lista_config(valor):
+    if valor is None or valor == "": return []
+    if isinstance(valor, str): return [x.strip() for x in valor.replace(";", ",").split(",") if x.strip()]
+    if isinstance(valor, (list, tuple)): return list(valor)
+    return [valor]
+
+
+def _fecha(valor):
+    if isinstance(valor, datetime.datetime): return valor.date()
+    if isinstance(valor, datetime.date): return valor
+    try:
+        return datetime.datetime.strptime(str(valor).strip(), '%Y-%m-%d').date()
+    except ValueError:
+        return datetime.datetime.strptime(str(valor).strip(), '%d/%m/%Y').date()
+
+
+# Tipos de día de config["calendario"] (None si no hay calendario explícito)
+def dias_calendario(config):
+    dias = _lista_config(config.get("calendario"))
+    if not dias: return None
+    tipos = []
+    for d in dias:
+        tipo = CODIGOS_TIPO_DIA.get(str(d).strip().lower())
+        if tipo is None:
+            raise ValueError(f"calendario: tipo de día desconocido '{d}' (N normal, E extra, P parado)")
+        tipos.append(tipo)
+    return tipos
+
+
+# Índices de los días (desde 0) parados por día de la semana o festivo
+def _dias_parados(config, n_dias):
+    inicio = _fecha(config.get("fecha_inicio", datetime.date.today()))
+    semana = set()
+    for d in _lista_config(config.get("dias_parados")):
+        if str(d).strip().lower() not in DIAS_SEMANA:
+            raise ValueError(f"dias_parados: día de la semana desconocido '{d}'")
+        semana.add(DIAS_SEMANA[str(d).strip().lower()])
+    festivos = {(_fecha(f) - inicio).days for f in _lista_config(config.get("festivos"))}
+    return [dia for dia in range(n_dias) if (inicio + datetime.timedelta(days=dia)).weekday() in semana or dia in festivos]
+
+
+# Tipo de día de cada paso (índice = paso; la posición 0 no se usa)
+def tipos_paso(config, p, n):
+    pasos_dia = 24 * n; n_pasos = p["duracion_total_real"] * n
+    tipos = np.full(n_pasos + 1, NORMAL, dtype=np.int8)
+    dias = dias_calendario(config)
+    if dias is None:
+        tipos[int(config.get("duracion_simulacion", 0) * n) + 1:] = EXTRA # Pasos tras la duración base
+    else:
+        tipos[1:] = np.repeat(np.array(dias, dtype=np.int8), pasos_dia)[:n_pasos]
+    for dia in _dias_parados(config, (p["duracion_total_real"] + 23) // 24):
+        tipos[dia * pasos_dia + 1:(dia + 1) * pasos_dia + 1] = PARADO
+    return tipos
+
+
+# --- HORARIO COMPILADO ---
+# Todo el calendario de turnos se evalúa una vez, con operaciones sobre arrays: por paso
+# (índice = paso, la posición 0 no se usa) los kg/paso de cada proceso y los objetivos
+# diarios. simulate no compara horarios ni tipos de día: solo lee estos arrays.
+#  - despiece: kg ya recortados al total del día (no depende del resto de inventarios)
+#  - cajas, placas, fresco, vaciado: kg/paso pedidos (balance_camara los limita a lo que hay)
+#  - fresco_previsto: fresco recortado al tope diario si la cámara siempre tiene género
+#  - despiece_hoy / fresco_hoy_previsto: contadores del día tras cada paso
+#  - turnos: pasos dentro de algún horario de despiece/cajas/placas/fresco (filas por_eventos)
+#  - vaciado_activo: máscara de pasos de vaciado con kg > 0 (para siguiente_paso_activo)
+class HorarioCompilado:
+    def __init__(self, config, p, n=1, desde=None):
+        pasos_dia = 24 * n
+        self.pasos_por_hora = n
+        n_pasos = p["duracion_total_real"] * n
+        n_dias = (p["duracion_total_real"] + 23) // 24
+        self.tipos = tipos = tipos_paso(config, p, n)
+        pasos = np.arange(n_pasos + 1)
+        paso_del_dia = (pasos - 1) % pasos_dia; dia = (pasos - 1) // pasos_dia
+        normal = tipos == NORMAL; extra = tipos == EXTRA
+
+        if config.get("por_dia"):
+            ritmos = [_ritmos_en_pasos(r, n) for r in calcular_ritmos_por_dia(config, n_dias)]
+        else:
+            ritmos = [_ritmos_en_pasos(_ritmos_dia(p), n)] * n_dias
+        self.pct_huesos = [r[0] for r in ritmos] # Por día
+        # Valores diarios llevados a cada paso
+        def por_paso(valores_dia):
+            return np.concatenate(([0.0], np.repeat(np.array(valores_dia, dtype=float), pasos_dia)[:n_pasos]))
+
+        def ventana(inicio, fin):
+            return (paso_del_dia >= inicio) & (paso_del_dia < fin)
+
+        # Máscara y kg/paso de un proceso en días normales y (si está activado) en días extra
+        def proceso(inicio, fin, kg, con_extra, inicio_extra, fin_extra, kg_extra):
+            en_normal = normal & ventana(inicio, fin)
+            en_extra = extra & ventana(inicio_extra, fin_extra) if con_extra else np.zeros(n_pasos + 1, dtype=bool)
+            return en_normal | en_extra, np.where(en_normal, kg, np.where(en_extra, kg_extra, 0.0))
+
+        d_extra = config.get("d_extra_check", False); f_extra = config.get("f_extra_check", False)
+        activo_despiece, kg_despiece = proceso(config.get("d_inicio", 0) * n, por_paso([r[3] for r in ritmos]), por_paso([r[1] for r in ritmos]),
+                                               d_extra, config.get("d_inicio_extra", 0) * n, por_paso([r[6] for r in ritmos]), por_paso([r[4] for r in ritmos]))
+        activo_cajas, cajas = proceso(config.get("c_inicio", 0) * n, p["fin_cajas"] * n, p["kg_hora_cajas_total"] / n,
+                                      config.get("c_extra_check", False), config.get("c_inicio_extra", 0) * n, p["fin_cajas_extra"] * n, config.get("c_kg_extra", 0) / n)
+        activo_placas, placas = proceso(config.get("p_inicio", 0) * n, p["fin_placas"] * n, config.get("p_kg", 0) / n,
+                                        config.get("p_extra_check", False), config.get("p_inicio_extra", 0) * n, p["fin_placas_extra"] * n, config.get("p_kg_extra", 0) / n)
+        activo_fresco, fresco = proceso(config.get("f_inicio", 0) * n, p["fin_fresco"] * n, p["kg_hora_fresco"] / n,
+                                        f_extra, config.get("f_inicio_extra", 0) * n, p["fin_fresco_extra"] * n, p["kg_hora_fresco_extra"] / n)
+        _, vaciado = proceso(config.get("v_inicio", 0) * n, p["fin_vaciado"] * n, config.get("v_kg", 0) / n,
+                             config.get("v_extra_check", False), config.get("v_inicio_extra", 0) * n, p["fin_vaciado_extra"] * n, config.get("v_kg_extra", 0) / n)
+        turnos = activo_despiece | activo_cajas | activo_placas | activo_fresco
+        turnos[0] = False
+
+        # Objetivos del día (columnas del historial); en días parados, 0
+        total_normal = por_paso([r[2] for r in ritmos]); total_extra = por_paso([r[5] for r in ritmos])
+        objetivo_despiece = np.where(extra & d_extra, total_extra, total_normal)
+        objetivo_fresco = np.where(extra & f_extra, float(config.get("f_kg_dia_extra", 0)), float(config.get("f_kg_dia", 0)))
+        parado = tipos == PARADO
+        objetivo_despiece[parado] = 0.0; objetivo_fresco[parado] = 0.0
+
+        # Despiece recortado al total del día y fresco recortado a su tope (mismo orden de sumas
+        # que hacía el bucle paso a paso). El fresco es el previsto si la cámara nunca se queda
+        # sin género; balance_camara lo corrige si falta. Al reanudar (desde=PuntoControl) solo
+        # se compilan los pasos posteriores y el día en curso sigue con sus contadores.
+        paso0 = desde.paso if desde is not None else 0
+        dia0 = (paso0 - 1) // pasos_dia if paso0 > 0 else -1
+        dias = dia.tolist()
+        def recortar(activo, kg_paso, objetivos, hoy_inicial):
+            recortado = np.zeros(n_pasos + 1); acumulado = np.zeros(n_pasos + 1)
+            kg_paso = kg_paso.tolist(); objetivos = objetivos.tolist()
+            hoy = hoy_inicial; dia_hoy = dia0
+            if paso0 > 0: acumulado[paso0] = hoy
+            for paso in np.flatnonzero(activo[paso0 + 1:]).tolist():
+                paso += paso0 + 1
+                if dias[paso] != dia_hoy: dia_hoy = dias[paso]; hoy = 0.0
+                total = objetivos[paso]
+                if hoy < total:
+                    kg = kg_paso[paso]
+                    if hoy + kg > total: kg = total - hoy
+                    if kg > 0.01: recortado[paso] = kg; hoy += kg; acumulado[paso] = hoy
+            return recortado, self._por_dia(acumulado, n_dias, pasos_dia)
+
+        mismo_dia = desde is not None and desde.dia == dia0
+        despiece, despiece_hoy = recortar(activo_despiece, kg_despiece, objetivo_despiece, desde.kg_despiece_hoy if mismo_dia else 0.0)
+        fresco_previsto, fresco_hoy = recortar(activo_fresco & (fresco > 0), fresco, objetivo_fresco, desde.kg_fresco_hoy if mismo_dia else 0.0)
+
+        self.es_dia_extra = extra
+        self.despiece = despiece; self.cajas = cajas; self.placas = placas
+        self.fresco = fresco; self.fresco_previsto = fresco_previsto; self.vaciado = vaciado
+        self.despiece_hoy = despiece_hoy; self.fresco_hoy_previsto = fresco_hoy
+        self.objetivo_despiece = objetivo_despiece; self.objetivo_fresco = objetivo_fresco
+        self.turnos = turnos
+        self.vaciado_activo = bytearray((vaciado > 0).astype(np.uint8).tobytes())
+
+    # Contador del día en cada paso a partir de su valor tras cada paso activo (0 en el resto):
+    # los contadores solo crecen dentro del día, así que basta el máximo acumulado por día
+    @staticmethod
+    def _por_dia(acumulado, n_dias, pasos_dia):
+        n_pasos = len(acumulado) - 1
+        relleno = np.zeros(n_dias * pasos_dia); relleno[:n_pasos] = acumulado[1:]
+        por_dia = np.maximum.accumulate(relleno.reshape(n_dias, pasos_dia), axis=1).reshape(-1)[:n_pasos]
+        return np.concatenate(([acumulado[0]], por_dia))
+
+
+# --- BALANCE DE LA CÁMARA ---
+# La cámara no depende de los túneles (lo que no cabe en ellos va a "Congelar Fuera"), así
+# que su balance se calcula para todo el horizonte de una vez. Cada paso aplica
+#   x -> max(max(x + despiece - cajas, 0) - placas, 0) - fresco = max(x + a, -fresco)
+# con a = despiece - cajas - placas - fresco, y esa recursión (de Lindley) tiene solución
+# cerrada con sumas y máximos acumulados:  x_k = S_k + max(x_0, max_j<=k (-fresco_j - S_j)).
+# Solo vale mientras el fresco previsto se sirve entero (x_k >= 0). Si falta género, el tope
+# diario depende de lo servido: ese tramo se calcula paso a paso hasta que acaba el fresco
+# del día, y desde ahí se vuelve a la solución cerrada.
+# Devuelve arrays por posición (0 = estado en paso_inicial, k = paso_inicial + k): cámara,
+# kg de cajas hacia los túneles, kg congelados acumulados y fresco cargado en el día.
+def balance_camara(horario, paso_inicial, ultimo_paso, kg_camara, kg_congelados):
+    tramo = slice(paso_inicial + 1, ultimo_paso + 1)
+    despiece = horario.despiece[tramo]; ritmo_cajas = horario.cajas[tramo]; ritmo_placas = horario.placas[tramo]
+    fresco = horario.fresco_previsto[tramo]
+    camara = np.empty(ultimo_paso - paso_inicial + 1); camara[0] = kg_camara
+    cajas = np.empty(len(despiece)); placas = np.empty(len(despiece))
+    fresco_hoy = horario.fresco_hoy_previsto[paso_inicial:ultimo_paso + 1].copy()
+
+    k = 1
+    while k < len(camara):
+        suma = np.cumsum(despiece[k - 1:] - ritmo_cajas[k - 1:] - ritmo_placas[k - 1:] - fresco[k - 1:])
+        tramo_camara = suma + np.maximum(camara[k - 1], np.maximum.accumulate(-fresco[k - 1:] - suma))
+        falta = np.flatnonzero(tramo_camara < -1e-6)
+        fin = k + int(falta[0]) if len(falta) else len(camara)
+        tramo_camara = tramo_camara[:fin - k]; tramo_camara[tramo_camara < 1e-6] = 0.0 # Restos de redondeo
+        camara[k:fin] = tramo_camara
+        disponible = camara[k - 1:fin - 1] + despiece[k - 1:fin - 1]
+        cajas[k - 1:fin - 1] = np.minimum(ritmo_cajas[k - 1:fin - 1], disponible); disponible -= cajas[k - 1:fin - 1]
+        placas[k - 1:fin - 1] = np.minimum(ritmo_placas[k - 1:fin - 1], disponible)
+        if fin < len(camara):
+            k = _balance_camara_escalar(horario, paso_inicial, fin, camara, cajas, placas, fresco_hoy)
+        else:
+            k = fin
+
+    # Congelados en el mismo orden de sumas que el bucle paso a paso (cajas y luego placas)
+    salidas = np.empty(2 * len(cajas) + 1); salidas[0] = kg_congelados
+    salidas[1::2] = cajas; salidas[2::2] = placas
+    congelados = np.cumsum(salidas)[::2]
+    return camara, np.concatenate(([0.0], cajas)), congelados, fresco_hoy
+
+
+# Balance paso a paso desde la posición k hasta el último paso con fresco de ese día (rellena
+# los arrays de balance_camara y deja el fresco del día con lo realmente cargado). Devuelve la
+# posición siguiente.
+def _balance_camara_escalar(horario, paso_inicial, k, camara, cajas, placas, fresco_hoy):
+    pasos_dia = 24 * horario.pasos_por_hora
+    paso = paso_inicial + k
+    inicio_dia = (paso - 1) // pasos_dia * pasos_dia + 1
+    fin_dia = min(inicio_dia + pasos_dia, paso_inicial + len(camara)) # Exclusivo
+    con_fresco = np.flatnonzero(horario.fresco[paso:fin_dia])
+    fin = paso + int(con_fresco[-1]) + 1 if len(con_fresco) else paso + 1
+
+    tramo = slice(paso, fin)
+    despiece = horario.despiece[tramo].tolist(); ritmo_cajas = horario.cajas[tramo].tolist(); ritmo_placas = horario.placas[tramo].tolist()
+    ritmo_fresco = horario.fresco[tramo].tolist(); objetivo_fresco = horario.objetivo_fresco[tramo].tolist()
+    kg_camara = float(camara[k - 1]); hoy = float(fresco_hoy[k - 1]) if paso > inicio_dia else 0.0
+    for j in range(fin - paso):
+        i = k + j
+        kg_camara += despiece[j]
+        kg = min(ritmo_cajas[j], kg_camara); kg_camara -= kg; cajas[i - 1] = kg
+        kg = min(ritmo_placas[j], kg_camara); kg_camara -= kg; placas[i - 1] = kg
+        demanda = ritmo_fresco[j]; objetivo = objetivo_fresco[j]
+        if demanda and hoy < objetivo:
+            if hoy + demanda > objetivo: demanda = objetivo - hoy
+            if demanda > 0.01: kg = min(demanda, kg_camara); kg_camara -= kg; hoy += kg
+        camara[i] = kg_camara; fresco_hoy[i] = hoy
+    fresco_hoy[fin - paso_inicial:fin_dia - paso_inicial] = hoy
+    return fin - paso_inicial
+
+
+# Siguiente paso > paso_actual en el que puede cambiar algún inventario
+def siguiente_paso_activo(paso_actual, turnos, vaciado, hora_lista):
+    siguiente = turnos.find(1, paso_actual + 1)
+    if hora_lista is not None:
+        desde = max(paso_actual + 1, math.ceil(hora_lista)) if hora_lista > -math.inf else paso_actual + 1
+        paso_vaciado = vaciado.find(1, desde) if desde < len(vaciado) else -1
+        if paso_vaciado != -1 and (siguiente == -1 or paso_vaciado < siguiente): siguiente = paso_vaciado
+    return siguiente if siguiente != -1 else len(turnos)
+
+
+# --- RESULTADO DE UNA SIMULACIÓN ---
+# El historial se guarda por columnas (arrays de numpy, una posición por fila); las filas como
+# diccionarios y el DataFrame solo se construyen si alguien los pide.
+class ResultadoSimulacion:
+    def __init__(self, parametros, columnas, estados_tuneles, afinidades_tuneles, resumen_diario, tuneles, kg_congelar_fuera_inicial=0.0, pasos_por_hora=1, inicio=None, punto_control=None, paso_desborde=None):
+        self.parametros = parametros
+        self.duracion_total_real = parametros["duracion_total_real"]
+        self.pasos_por_hora = pasos_por_hora
+        self.n_pasos = self.duracion_total_real * pasos_por_hora
+        self.columnas = columnas # {columna: array}, una fila por paso simulado (por_eventos: solo pasos con actividad)
+        self.filas = len(columnas['paso'])
+        # Estado de cada túnel por fila (None si no se registró): array (filas, túneles, 4) con
+        # palés, palés huesos, palés carne y kg, y array (filas, túneles) con el código de afinidad
+        self.estados_tuneles = estados_tuneles
+        self.afinidades_tuneles = afinidades_tuneles
+        self.resumen_diario = resumen_diario # Una fila por fin de día
+        self.tuneles = tuneles # Estado final de los túneles
+        self.kg_congelar_fuera_inicial = kg_congelar_fuera_inicial # Kg fuera antes de la primera fila (inventario inicial que no cupo)
+        self.inicio = inicio if inicio is not None else datetime.datetime.combine(datetime.date.today(), datetime.time(0, 0))
+        self.punto_control = punto_control # Estado del motor tras el último paso (para reanudar o bifurcar)
+        self.paso_desborde = paso_desborde # Primer paso en que algo no cupo en los túneles (None si nunca)
+        self._historial = None; self._df = None
+
+    def fecha(self, paso):
+        return self.inicio + datetime.timedelta(minutes=(int(paso) - 1) * 60 // self.pasos_por_hora)
+
+    # Estado de los túneles en la fila i, como Tunnel.get_estado() (None si no se registró)
+    def estado_tuneles(self, i):
+        if self.estados_tuneles is None: return None
+        return [(*valores, NOMBRES_AFINIDAD[afinidad]) for valores, afinidad in zip(self.estados_tuneles[i].tolist(), self.afinidades_tuneles[i].tolist())]
+
+    # Fila i como diccionario (mismas claves que el antiguo historial)
+    def fila(self, i):
+        fila = {columna: valores[i].item() for columna, valores in self.columnas.items()}
+        fila['datetime'] = self.fecha(fila['paso'])
+        fila['tuneles'] = self.estado_tuneles(i)
+        return fila
+
+    # Lista de filas (diccionarios), construida la primera vez que se pide
+    @property
+    def historial(self):
+        if self._historial is None:
+            self._historial = [self.fila(i) for i in range(self.filas)]
+        return self._historial
+
+    # DataFrame indexado por 'datetime' (sin el estado de los túneles), construido una sola vez
+    def dataframe(self):
+        if self._df is None:
+            import pandas as pd
+
+            pasos = self.columnas['paso']
+            fechas = pd.Timestamp(self.inicio) + pd.to_timedelta((pasos - 1) * 60 // self.pasos_por_hora, unit='min')
+            self._df = pd.DataFrame(self.columnas, index=pd.DatetimeIndex(fechas, name='datetime'))
+        return self._df
+
+    # Las vistas derivadas (filas, DataFrame) no se guardan al serializar; se reconstruyen al pedirlas
+    def __getstate__(self):
+        estado = dict(self.__dict__)
+        estado['_historial'] = None; estado['_df'] = None
+        return estado
+
+    def pico(self, columna):
+        valores = self.columnas[columna]
+        return float(valores.max()) if len(valores) else 0.0
+
+    # Horas en las que las cajas no cupieron en los túneles (crece "Kg Congelar Fuera")
+    def horas_saturacion(self):
+        fuera = self.columnas['Kg Congelar Fuera']
+        anterior = np.concatenate(([self.kg_congelar_fuera_inicial], fuera[:-1]))
+        return int(np.count_nonzero(fuera > anterior + 0.01)) / self.pasos_por_hora
+
+
+# --- PUNTO DE CONTROL ---
+# Estado completo del motor tras un paso: inventarios, contadores del día, resumen diario y
+# contenido de cada túnel. simulate(config, desde=punto) continúa desde aquí, así que se
+# puede reanudar una simulación larga o bifurcar muchos escenarios desde un mismo
+# calentamiento (los túneles de la flota vienen del punto de control, no de la configuración).
+# a_dict() / desde_dict() lo pasan a una forma compacta de tipos básicos (apta para JSON).
+class PuntoControl:
+    def __init__(self, paso, pasos_por_hora, dia, kg_camara, kg_congelar_fuera, kg_despiece_hoy, kg_fresco_hoy, kg_congelados, kg_tuneles, pallets_tuneles, resumen_diario, tuneles):
+        self.paso = paso # Último paso procesado (0 = antes de empezar)
+        self.pasos_por_hora = pasos_por_hora
+        self.dia = dia # Día (desde 0) de kg_despiece_hoy / kg_fresco_hoy; -1 si aún no empezó ninguno
+        self.kg_camara = kg_camara
+        self.kg_congelar_fuera = kg_congelar_fuera
+        self.kg_despiece_hoy = kg_despiece_hoy
+        self.kg_fresco_hoy = kg_fresco_hoy
+        self.kg_congelados = kg_congelados
+        # Totales de la flota tal como los lleva DespachadorTuneles (sumados por diferencias):
+        # se restauran tal cual para que reanudar dé exactamente el mismo resultado
+        self.kg_tuneles = kg_tuneles
+        self.pallets_tuneles = pallets_tuneles
+        self.resumen_diario = resumen_diario
+        self.tuneles = tuneles # [(Tunnel.definicion(), Tunnel.exportar_estado()), ...]
+
+    @classmethod
+    def capturar(cls, paso, pasos_por_hora, dia, kg_camara, kg_congelar_fuera, kg_despiece_hoy, kg_fresco_hoy, kg_congelados, kg_tuneles, pallets_tuneles, resumen_diario, tuneles):
+        return cls(paso, pasos_por_hora, dia, kg_camara, kg_congelar_fuera, kg_despiece_hoy, kg_fresco_hoy, kg_congelados, kg_tuneles, pallets_tuneles,
+                   [dict(r) for r in resumen_diario], [(t.definicion(), t.exportar_estado()) for t in tuneles])
+
+    # Túneles nuevos con el contenido guardado (cada llamada da una copia independiente)
+    def crear_tuneles(self):
+        tuneles = []
+        for definicion, estado in self.tuneles:
+            t = Tunnel(*definicion); t.pasos_por_hora = self.pasos_por_hora
+            t.restaurar_estado(estado)
+            tuneles.append(t)
+        return tuneles
+
+    def a_dict(self):
+        d = {k: v for k, v in self.__dict__.items() if k != "tuneles"}
+        d["tuneles"] = [[list(definicion[:4]) + [list(definicion[4]), list(definicion[5])], list(estado[:4]) + [[list(l) for l in estado[4]]]]
+                        for definicion, estado in self.tuneles]
+        return d
+
+    @classmethod
+    def desde_dict(cls, d):
+        d = dict(d)
+        d["tuneles"] = [(tuple(definicion), tuple(estado)) for definicion, estado in d["tuneles"]]
+        return cls(**d)
+
+
+# Punto de control en el paso 0 con el contenido real de los túneles, en lugar del reparto
+# aproximado de kg_iniciales_tunel_congelado / kg_iniciales_tunel_frescos.
+#   contenidos: {nombre_túnel: [(producto, kg, palés, horas_restantes), ...]} en orden de salida
+#               (primero el lote del frente); producto "Huesos", "Carne" o "Congelado".
+# Los túneles que no aparecen empiezan vacíos. kg_camara por defecto: kg_iniciales_camara.
+def punto_control_inicial(config, contenidos, kg_camara=None, kg_congelar_fuera=0.0):
+    n = pasos_por_hora(config)
+    tuneles = crear_tuneles(definiciones_tuneles(config))
+    por_nombre = {t.name: t for t in tuneles}
+    desconocidos = set(contenidos) - set(por_nombre)
+    if desconocidos:
+        raise ValueError(f"Túneles desconocidos en el contenido inicial: {sorted(desconocidos)}")
+    for nombre, lotes in contenidos.items():
+        t = por_nombre[nombre]
+        kg_total = pallets_total = pallets_huesos = pallets_carne = 0.0; estado_lotes = []
+        for producto, kg, pallets, horas_restantes in lotes:
+            codigo = CODIGOS_PRODUCTO.get(str(producto).strip().capitalize(), producto)
+            if codigo not in t.productos and codigo != CONGELADO:
+                raise ValueError(f"Túnel '{nombre}': no admite el producto '{producto}'")
+            horas = t.horas_congelacion[codigo] * n
+            if codigo == CONGELADO or horas_restantes <= 0 or horas <= 0:
+                hora_entrada, hora_lista = -999, -math.inf
+            else:
+                hora_lista = horas_restantes * n; hora_entrada = hora_lista - horas
+            estado_lotes.append((float(kg), float(pallets), hora_entrada, codigo, hora_lista))
+            kg_total += kg; pallets_total += pallets
+            if codigo == HUESOS: pallets_huesos += pallets
+            elif codigo == CARNE: pallets_carne += pallets
+        if pallets_total > t.max_pallets + 0.001:
+            raise ValueError(f"Túnel '{nombre}': {pallets_total:g} palés no caben en {t.max_pallets:g}")
+        t.restaurar_estado((float(kg_total), float(pallets_total), float(pallets_huesos), float(pallets_carne), estado_lotes))
+    if kg_camara is None: kg_camara = config.get("kg_iniciales_camara", 0)
+    despacho = DespachadorTuneles(tuneles)
+    return PuntoControl.capturar(0, n, -1, float(kg_camara), float(kg_congelar_fuera), 0.0, 0.0, 0.0, despacho.kg_total, despacho.pallets_total, [], tuneles)
+
+
+# --- PREPARACIÓN DE UNA SIMULACIÓN ---
+# Común a simulate e iterar_simulacion: túneles con el inventario inicial (o los del punto de
+# control), horario compilado, balance de la cámara de todo el horizonte y despachador.
+def _preparar(config, tuneles, desde, hasta_hora, diagnostico):
+    p = calcular_parametros(config)
+    n = pasos_por_hora(config)
+    if desde is not None:
+        if tuneles is not None:
+            raise ValueError("simulate: 'tuneles' y 'desde' son incompatibles (el punto de control ya trae los túneles)")
+        if desde.pasos_por_hora != n:
+            raise ValueError(f"El punto de control usa pasos de {60 // desde.pasos_por_hora} min y la configuración de {60 // n} min")
+        if desde.paso > p["duracion_total_real"] * n:
+            raise ValueError(f"El punto de control (paso {desde.paso}) está después del final de la simulación")
+        tuneles = desde.crear_tuneles()
+    elif tuneles is None:
+        tuneles = crear_tuneles(definiciones_tuneles(config))
+    for t in tuneles: t.pasos_por_hora = n
+
+    # El horario se compila una sola vez (ver HorarioCompilado) y la cámara se resuelve para todo
+    # el horizonte (ver balance_camara): el bucle solo recorre los pasos en los que cambian los túneles
+    pasos_dia = 24 * n
+    n_pasos = p["duracion_total_real"] * n
+    ultimo_paso = n_pasos if hasta_hora is None else max(0, min(n_pasos, int(hasta_hora * n)))
+    horario = HorarioCompilado(config, p, n, desde)
+    pct_huesos = p["pct_huesos"] # Reparto del inventario inicial (cada día usa horario.pct_huesos)
+    if diagnostico is not None: diagnostico.vuelta("horario")
+
+    kg_huesos_pallet = config.get("kg_pallet_huesos", 1100)
+    kg_carne_pallet = config.get("kg_pallet_carne", 1250)
+
+    kg_camara_fresco = float(config.get("kg_iniciales_camara", 0)); kg_congelar_fuera = 0.0
+    resumen_diario = []
+    kg_total_congelados_acumulado = 0.0
+
+    # Distribuir KG iniciales en túneles
+    kg_iniciales_congelado = float(config.get("kg_iniciales_tunel_congelado", 0)); kg_iniciales_frescos = float(config.get("kg_iniciales_tunel_frescos", 0))
+    horas_restantes = int(config.get("horas_restantes_congelacion", 0)) if config.get("kg_iniciales_tunel_frescos", 0) > 0 else 0
+    kg_sobrantes_iniciales_congelado = 0.0; kg_sobrantes_iniciales_frescos = 0.0
+    if desde is not None: # Al reanudar, los túneles ya vienen llenos del punto de control
+        kg_iniciales_congelado = kg_iniciales_frescos = 0.0
+
+    if kg_iniciales_congelado > 0:
+        kg_a_distribuir_congelado = kg_iniciales_congelado
+        for t in tuneles:
+            metidos = t.add_initial_kg(kg_a_distribuir_congelado, hora_entrada_calculada=-999, porcentaje_huesos=pct_huesos, kg_per_pallet_huesos=kg_huesos_pallet, kg_per_pallet_carne=kg_carne_pallet)
+            kg_a_distribuir_congelado -= metidos
+            if kg_a_distribuir_congelado <= 0.01: break
+        kg_sobrantes_iniciales_congelado = max(0, kg_a_distribuir_congelado)
+
+    if kg_iniciales_frescos > 0:
+        kg_a_distribuir_frescos = kg_iniciales_frescos
+        for t in tuneles:
+            # Entraron hace (horas del producto más lento del túnel - horas restantes)
+            max_horas_congelacion = max(t.horas_congelacion[producto] for producto in t.productos)
+            hora_entrada_frescos = -(max_horas_congelacion - horas_restantes) * n if horas_restantes > 0 else -999
+            metidos = t.add_initial_kg(kg_a_distribuir_frescos, hora_entrada_calculada=hora_entrada_frescos, porcentaje_huesos=pct_huesos, kg_per_pallet_huesos=kg_huesos_pallet, kg_per_pallet_carne=kg_carne_pallet)
+            kg_a_distribuir_frescos -= metidos
+            if kg_a_distribuir_frescos <= 0.01: break
+        kg_sobrantes_iniciales_frescos = max(0, kg_a_distribuir_frescos)
+
+    kg_congelar_fuera = kg_sobrantes_iniciales_congelado + kg_sobrantes_iniciales_frescos
+    paso_inicial = 0; dia_final = -1
+    if desde is not None:
+        kg_camara_fresco = desde.kg_camara; kg_congelar_fuera = desde.kg_congelar_fuera
+        kg_total_congelados_acumulado = desde.kg_congelados
+        resumen_diario = [dict(r) for r in desde.resumen_diario]
+        paso_inicial = desde.paso; dia_final = desde.dia; ultimo_paso = max(ultimo_paso, paso_inicial)
+    if diagnostico is not None: diagnostico.vuelta("inventario inicial")
+
+    # --- 1-2. Cámara: despiece, cajas, placas y fresco de todo el horizonte ---
+    camara, kg_cajas, congelados, fresco_hoy = balance_camara(horario, paso_inicial, ultimo_paso, kg_camara_fresco, kg_total_congelados_acumulado)
+
+    if diagnostico is not None:
+        diagnostico.vuelta("camara")
+        despacho = DespachadorInstrumentado(tuneles, diagnostico)
+    else:
+        despacho = DespachadorTuneles(tuneles)
+    if desde is not None:
+        despacho.kg_total = desde.kg_tuneles; despacho.pallets_total = desde.pallets_tuneles
+    return (p, n, tuneles, horario, despacho, paso_inicial, ultimo_paso, dia_final, kg_congelar_fuera, resumen_diario,
+            camara, kg_cajas, congelados, fresco_hoy, kg_huesos_pallet, kg_carne_pallet)
+
+
+# Un paso de los túneles: cajas del paso (dos pasadas por producto) y vaciado.
+# Devuelve (kg de cajas que no cupieron, kg vaciados).
+def _paso_tuneles(despacho, paso_actual, kg_a_distribuir_cajas, pct_huesos, kg_por_vaciar_este_paso, kg_huesos_pallet, kg_carne_pallet):
+    kg_fuera = 0.0
+    # A. Cajas: de la cámara a los túneles (lo que no cabe, a congelar fuera)
+    if kg_a_distribuir_cajas > 0:
+        kg_huesos_paso = kg_a_distribuir_cajas * (pct_huesos / 100.0)
+        kg_carne_paso = kg_a_distribuir_cajas - kg_huesos_paso
+
+        # PASADA 1 (PREFERIDA / VACÍA / MIXTA)
+        kg_huesos_paso = despacho.repartir(kg_huesos_paso, paso_actual, HUESOS, kg_huesos_pallet, kg_carne_pallet, force_mix=False)
+        kg_carne_paso = despacho.repartir(kg_carne_paso, paso_actual, CARNE, kg_huesos_pallet, kg_carne_pallet, force_mix=False)
+
+        # PASADA 2 (FORZAR MEZCLA)
+        kg_huesos_paso = despacho.repartir(kg_huesos_paso, paso_actual, HUESOS, kg_huesos_pallet, kg_carne_pallet, force_mix=True)
+        kg_carne_paso = despacho.repartir(kg_carne_paso, paso_actual, CARNE, kg_huesos_pallet, kg_carne_pallet, force_mix=True)
+        kg_fuera = kg_huesos_paso + kg_carne_paso
+
+    # --- 3. Salida Túnel (Vaciado) ---
+    kg_vaciados = 0.0
+    if kg_por_vaciar_este_paso > 0:
+        kg_vaciados = kg_por_vaciar_este_paso - despacho.vaciar(kg_por_vaciar_este_paso, paso_actual)
+    return kg_fuera, kg_vaciados
+
+
+# Recorre los pasos en los que cambian los túneles (cajas que entran o vaciado con algún lote
+# listo) hasta ultimo_paso, procesa cada uno con _paso_tuneles y entrega (paso, kg de cajas
+# que no cupieron, kg vaciados). Al recibir cada paso, despacho.cambiados tiene los túneles que
+# cambiaron en él (se vacía antes del siguiente). Es el bucle de simulate y de iterar_simulacion.
+def _recorrer_tuneles(despacho, horario, kg_cajas, paso_inicial, ultimo_paso, kg_huesos_pallet, kg_carne_pallet):
+    pasos_dia = 24 * horario.pasos_por_hora
+    con_cajas = np.zeros(len(horario.turnos), dtype=np.uint8); con_cajas[paso_inicial + 1:ultimo_paso + 1] = kg_cajas[1:] > 0
+    con_cajas = bytearray(con_cajas.tobytes()); vaciado_activo = horario.vaciado_activo
+    kg_cajas = kg_cajas.tolist(); kg_vaciado = horario.vaciado.tolist(); pct_por_dia = horario.pct_huesos
+    paso_actual = paso_inicial
+    while True:
+        paso_actual = siguiente_paso_activo(paso_actual, con_cajas, vaciado_activo, despacho.hora_lista_minima())
+        if paso_actual > ultimo_paso: return
+        despacho.cambiados.clear()
+        kg_fuera, kg_vaciados = _paso_tuneles(despacho, paso_actual, kg_cajas[paso_actual - paso_inicial], pct_por_dia[(paso_actual - 1) // pasos_dia],
+                                              kg_vaciado[paso_actual], kg_huesos_pallet, kg_carne_pallet)
+        yield paso_actual, kg_fuera, kg_vaciados
+
+
+# Columnas del historial (COLUMNAS_HISTORIAL) en los pasos `filas`; kg_tuneles, kg_fuera y
+# pallets: estado de los túneles en cada una de esas filas
+def _columnas_historial(horario, paso_inicial, camara, congelados, fresco_hoy, filas, kg_tuneles, kg_fuera, pallets):
+    k = filas - paso_inicial
+    columnas = {
+        'paso': filas, 'es_dia_extra': horario.es_dia_extra[filas],
+        'Kg Cámara Refrigerado': camara[k], 'Kg en Túneles (Total)': kg_tuneles, 'Kg Congelar Fuera': kg_fuera,
+        'kg_total_congelados': congelados[k],
+        'kg_procesados_despiece_hoy': horario.despiece_hoy[filas], 'objetivo_despiece_dia': horario.objetivo_despiece[filas],
+        'kg_cargados_fresco_hoy': fresco_hoy[k], 'objetivo_fresco_dia': horario.objetivo_fresco[filas],
+        'pallets_tuneles': pallets,
+    }
+    return {columna: valores.astype(COLUMNAS_HISTORIAL[columna]) for columna, valores in columnas.items()}
+
+
+# --- BUCLE PRINCIPAL ---
+# El reloj avanza en pasos enteros de config["paso_minutos"] (60 por defecto): horarios y
+# horas de congelación se pasan a pasos y los ritmos kg/h a kg/paso.
+# registrar_tuneles=False omite el estado por túnel de cada paso (procesos por lotes).
+# por_eventos=True salta los pasos en los que no hay ningún turno activo ni lote listo para
+# vaciar: los inventarios y el resumen diario son idénticos, pero el historial solo tiene
+# filas para los pasos procesados (el inventario se mantiene hasta la siguiente fila).
+# desde=PuntoControl continúa una simulación anterior (el historial empieza tras su paso; los
+# kg coinciden con la simulación completa salvo redondeos del balance de la cámara, ~1e-9 kg);
+# hasta_hora=H se detiene tras la hora H sin cambiar el calendario (días extra incluidos).
+# parar_en_desborde=True se detiene en el primer paso en que algo no cabe en los túneles
+# (resultado.paso_desborde; para búsquedas en las que basta saber si hay desborde).
+# diagnostico=Diagnostico() acumula tiempos por etapa y contadores (ver diagnostico.py).
+# on_progreso(fraccion) se llama cada ~1 % de los pasos; si lanza una excepción, la simulación
+# se interrumpe con ella (así se cancelan las simulaciones en segundo plano, ver trabajos.py).
+# El estado final queda en resultado.punto_control.
+def simulate(config, tuneles=None, registrar_tuneles=True, por_eventos=False, desde=None, hasta_hora=None, parar_en_desborde=False, diagnostico=None, on_progreso=None):
+    if diagnostico is not None: diagnostico.iniciar()
+    (p, n, tuneles, horario, despacho, paso_inicial, ultimo_paso, dia_final, kg_congelar_fuera, resumen_diario,
+     camara, kg_cajas, congelados, fresco_hoy, kg_huesos_pallet, kg_carne_pallet) = _preparar(config, tuneles, desde, hasta_hora, diagnostico)
+    pasos_dia = 24 * n; n_pasos = p["duracion_total_real"] * n; tipos = horario.tipos
+    start_datetime = datetime.datetime.combine(config.get('fecha_inicio', datetime.date.today()), datetime.time(0, 0))
+    kg_congelar_fuera_inicial = kg_congelar_fuera
+
+    # Estado de los túneles tras cada paso procesado (posición 0 = estado inicial)
+    procesados = array('q', [paso_inicial])
+    h_tuneles = array('d', [despacho.kg_total]); h_fuera = array('d', [kg_congelar_fuera]); h_pallets = array('d', [despacho.pallets_total])
+    estados_tuneles = afinidades_tuneles = None
+    if registrar_tuneles:
+        # Cada fila copia la anterior y solo se reescriben los túneles que han cambiado
+        filas_max = ultimo_paso - paso_inicial + 1
+        estados_tuneles = np.zeros((filas_max, len(tuneles), 4))
+        afinidades_tuneles = np.zeros((filas_max, len(tuneles)), dtype=np.int8)
+    despacho.cambiados.update(range(len(tuneles))) # La primera posición registra todos
+    fila = 0
+
+    pasos = _recorrer_tuneles(despacho, horario, kg_cajas, paso_inicial, ultimo_paso, kg_huesos_pallet, kg_carne_pallet)
+    paso_desborde = None
+    intervalo_aviso = max(1, (ultimo_paso - paso_inicial) // 100)
+    proximo_aviso = paso_inicial + intervalo_aviso if on_progreso is not None else n_pasos + 1 # Sin aviso: nunca se alcanza
+    while True:
+        if registrar_tuneles:
+            if fila > 0:
+                estados_tuneles[fila] = estados_tuneles[fila - 1]; afinidades_tuneles[fila] = afinidades_tuneles[fila - 1]
+            for i in despacho.cambiados:
+                t = tuneles[i]
+                estados_tuneles[fila, i] = (t.pallets_actual, t.pallets_huesos, t.pallets_carne, t.kg_actual)
+                afinidades_tuneles[fila, i] = t._afinidad
+        fila += 1
+        if parar_en_desborde and paso_desborde is not None: break
+
+        paso_actual, kg_fuera, _ = next(pasos, (None, 0.0, 0.0))
+        if paso_actual is None: break
+        if paso_actual >= proximo_aviso:
+            on_progreso((paso_actual - paso_inicial) / (ultimo_paso - paso_inicial))
+            proximo_aviso = paso_actual + intervalo_aviso
+        if kg_fuera > 0.01 and paso_desborde is None:
+            paso_desborde = paso_actual
+            if parar_en_desborde: ultimo_paso = paso_actual
+        kg_congelar_fuera += kg_fuera
+
+        procesados.append(paso_actual)
+        h_tuneles.append(despacho.kg_total); h_fuera.append(kg_congelar_fuera); h_pallets.append(despacho.pallets_total)
+
+    if diagnostico is not None:
+        diagnostico.contar("pasos_procesados", len(procesados) - 1)
+        despacho.volcar_contadores()
+        diagnostico.vuelta("bucle tuneles")
+
+    # --- 4. Registro ---
+    # Filas: todos los pasos, o (por_eventos) los de algún turno y los de vaciado procesados.
+    # Entre pasos procesados los túneles no cambian: cada fila toma el último estado anterior.
+    procesados = np.frombuffer(procesados, dtype=np.int64)
+    if por_eventos:
+        filas = np.union1d(np.flatnonzero(horario.turnos[paso_inicial + 1:ultimo_paso + 1]) + paso_inicial + 1, procesados[1:])
+    else:
+        filas = np.arange(paso_inicial + 1, ultimo_paso + 1)
+    estado = np.searchsorted(procesados, filas, side='right') - 1
+    h_tuneles = np.frombuffer(h_tuneles); h_fuera = np.frombuffer(h_fuera); h_pallets = np.frombuffer(h_pallets)
+    columnas = _columnas_historial(horario, paso_inicial, camara, congelados, fresco_hoy, filas, h_tuneles[estado], h_fuera[estado], h_pallets[estado])
+    if registrar_tuneles:
+        estados_tuneles = estados_tuneles[estado]; afinidades_tuneles = afinidades_tuneles[estado]
+
+    # Resumen de cada fin de día: el siguiente a los cierres ya hechos, hasta el último paso
+    cierre = min((len(resumen_diario) + 1) * pasos_dia, n_pasos) if len(resumen_diario) * pasos_dia < n_pasos else n_pasos + 1
+    while cierre <= ultimo_paso:
+        dia = (cierre - 1) // pasos_dia + 1; etiqueta_dia = f"Día {dia}"
+        if tipos[cierre] == EXTRA: etiqueta_dia = f"Día {dia} (Extra)"
+        elif tipos[cierre] == PARADO: etiqueta_dia = f"Día {dia} (Parado)"
+        i = int(np.searchsorted(procesados, cierre, side='right')) - 1
+        resumen_diario.append({'Día': etiqueta_dia, 'Kg Cámara Refrigerado': float(camara[cierre - paso_inicial]), 'Kg en Túneles (Total)': float(h_tuneles[i]), 'Kg Congelar Fuera': float(h_fuera[i])})
+        cierre = min(cierre + pasos_dia, n_pasos) if cierre < n_pasos else n_pasos + 1
+
+    if ultimo_paso > paso_inicial: dia_final = (ultimo_paso - 1) // pasos_dia
+    k = ultimo_paso - paso_inicial
+    punto = PuntoControl.capturar(ultimo_paso, n, dia_final, float(camara[k]), kg_congelar_fuera, float(horario.despiece_hoy[ultimo_paso]), float(fresco_hoy[k]),
+                                  float(congelados[k]), despacho.kg_total, despacho.pallets_total, resumen_diario, tuneles)
+    if diagnostico is not None: diagnostico.vuelta("historial")
+    return ResultadoSimulacion(p, columnas, estados_tuneles, afinidades_tuneles, resumen_diario, tuneles, kg_congelar_fuera_inicial, n, start_datetime, punto, paso_desborde)
+
+
+# --- SIMULACIÓN PASO A PASO ---
+# Generador con el mismo bucle que simulate (_recorrer_tuneles y _columnas_historial, así que da
+# los mismos números) que entrega cada fila del historial en cuanto se calcula, sin guardar el
+# historial: para volcarlo a un fichero, un socket o un panel, o para parar en cuanto se cumple
+# una condición, p. ej. la primera hora con desborde:
+#   primera = next((f for f in iterar_simulacion(config) if f['Kg Congelar Fuera'] > 0), None)
+# Cada fila es un diccionario con las claves de ResultadoSimulacion.fila() ('tuneles': tupla con
+# el get_estado() de cada túnel, la misma mientras ninguno cambie; None con registrar_tuneles=False)
+# más los flujos del paso: kg_despiece_paso, kg_cajas_paso, kg_placas_paso, kg_fresco_paso,
+# kg_vaciado_paso y kg_desborde_paso (cajas que no cupieron en los túneles).
+# Las opciones son las de simulate; el resumen diario y el punto de control no se calculan.
+def iterar_simulacion(config, tuneles=None, registrar_tuneles=True, por_eventos=False, desde=None, hasta_hora=None):
+    (_, n, tuneles, horario, despacho, paso_inicial, ultimo_paso, _, kg_congelar_fuera, _,
+     camara, kg_cajas, congelados, fresco_hoy, kg_huesos_pallet, kg_carne_pallet) = _preparar(config, tuneles, desde, hasta_hora, None)
+    pasos_dia = 24 * n
+    inicio = datetime.datetime.combine(config.get('fecha_inicio', datetime.date.today()), datetime.time(0, 0))
+
+    # Avanza los túneles hasta el siguiente paso procesado: (paso, estado de los túneles tras él,
+    # kg vaciados, kg que no cupieron); paso = ultimo_paso + 1 si ya no queda ninguno
+    pasos = _recorrer_tuneles(despacho, horario, kg_cajas, paso_inicial, ultimo_paso, kg_huesos_pallet, kg_carne_pallet)
+    def avanzar(estado, kg_congelar_fuera):
+        paso, kg_fuera, kg_vaciados = next(pasos, (ultimo_paso + 1, 0.0, 0.0))
+        if registrar_tuneles and despacho.cambiados:
+            estado = list(estado)
+            for i in despacho.cambiados: estado[i] = tuneles[i].get_estado()
+            estado = tuple(estado)
+        return paso, (despacho.kg_total, kg_congelar_fuera + kg_fuera, despacho.pallets_total, estado), kg_vaciados, kg_fuera
+
+    # Estado de los túneles: (kg, kg fuera, palés, estado por túnel o None)
+    actual = (despacho.kg_total, kg_congelar_fuera, despacho.pallets_total, tuple(t.get_estado() for t in tuneles) if registrar_tuneles else None)
+    siguiente, despues, kg_vaciados, kg_fuera = avanzar(actual[3], kg_congelar_fuera)
+    # Columnas que no dependen de los túneles, un día de pasos cada vez
+    for primero in range(paso_inicial + 1, ultimo_paso + 1, pasos_dia):
+        filas = np.arange(primero, min(primero + pasos_dia, ultimo_paso + 1))
+        ceros = np.zeros(len(filas))
+        columnas = _columnas_historial(horario, paso_inicial, camara, congelados, fresco_hoy, filas, ceros, ceros, ceros)
+        k = filas - paso_inicial
+        columnas['kg_despiece_paso'] = horario.despiece[filas]; columnas['kg_cajas_paso'] = kg_cajas[k]
+        columnas['kg_placas_paso'] = np.maximum(congelados[k] - congelados[k - 1] - kg_cajas[k], 0.0)
+        columnas['kg_fresco_paso'] = fresco_hoy[k] - np.where((filas - 1) % pasos_dia == 0, 0.0, fresco_hoy[k - 1])
+        claves = list(columnas)
+        for valores, en_turno in zip(zip(*(columnas[c].tolist() for c in claves)), horario.turnos[filas].tolist()):
+            paso = valores[0]
+            procesado = paso == siguiente
+            if procesado:
+                actual = despues; kg_vaciados_paso, kg_desborde_paso = kg_vaciados, kg_fuera
+                siguiente, despues, kg_vaciados, kg_fuera = avanzar(actual[3], actual[1])
+            else:
+                kg_vaciados_paso = kg_desborde_paso = 0.0
+            if por_eventos and not (procesado or en_turno): continue
+            fila = dict(zip(claves, valores))
+            fila['Kg en Túneles (Total)'], fila['Kg Congelar Fuera'], fila['pallets_tuneles'], fila['tuneles'] = actual
+            fila['datetime'] = inicio + datetime.timedelta(minutes=(paso - 1) * 60 // n)
+            fila['kg_vaciado_paso'] = kg_vaciados_paso; fila['kg_desborde_paso'] = kg_desborde_paso
+            yield fila
@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+# --- OPTIMIZADOR DE CAPACIDAD ---
+# Busca los ajustes más baratos de cajas y vaciado (c_duracion, c_linea_*, v_kg, v_duracion...)
+# con los que no hay que congelar nada fuera, en lugar de probarlos a mano.
+#
+# La búsqueda va en dos etapas, porque la cámara no depende de los túneles:
+#  1. Cajas (claves "c_*"): lo mínimo que mantiene la cámara por debajo de max_camara. Solo
+#     hace falta el balance de la cámara (motor.balance_camara), sin simular los túneles.
+#  2. Vaciado (claves "v_*"), con las cajas ya fijadas: lo mínimo con lo que todo cabe en los
+#     túneles. Cada prueba es una simulación que se corta en el primer desborde.
+# En cada etapa la primera variable se ajusta por bisección (más capacidad nunca empeora)
+# para cada punto de una rejilla gruesa de las demás, y luego se afina cada variable por
+# bisección con el resto fijo hasta que nada baja.
+#
+# Ejemplo:
+#   python optimizador.py -c config.csv -v v_kg=2000:15000:100 -v v_duracion=8:20
+#   python optimizador.py -c config.csv -v c_duracion=8:16 -v c_linea_0=500:3000:50 --max-camara 150000 -v v_kg=2000:15000:100
+import argparse
+import itertools
+import math
+
+from motor import HorarioCompilado, balance_camara, calcular_parametros, pasos_por_hora, simulate
+
+# Resolución por defecto de cada clave (kg/h o horas)
+RESOLUCION = {"v_kg": 100, "v_kg_extra": 100, "c_kg_extra": 100, "v_duracion": 1, "v_duracion_extra": 1, "c_duracion": 1, "c_duracion_extra": 1}
+RESOLUCION_LINEA = 50
+CLAVES_CAJAS = ("c_duracion", "c_duracion_extra", "c_kg_extra")
+CLAVES_VACIADO = ("v_kg", "v_duracion", "v_kg_extra", "v_duracion_extra")
+MAX_PUNTOS_REJILLA = 64 # Puntos de la rejilla gruesa de las variables secundarias de cada etapa
+MAX_PASADAS = 4
+
+
+def _es_linea(clave):
+    return clave.startswith("c_linea_") and clave[len("c_linea_"):].isdigit()
+
+
+# {clave: (minimo, maximo[, resolucion])} -> [(clave, minimo, maximo, resolucion)] validado
+def _leer_variables(variables):
+    leidas = []
+    for clave, limites in variables.items():
+        if clave not in CLAVES_CAJAS + CLAVES_VACIADO and not _es_linea(clave):
+            raise ValueError(f"Clave no soportada por el optimizador: '{clave}'")
+        minimo, maximo, *resto = limites
+        resolucion = resto[0] if resto else (RESOLUCION_LINEA if _es_linea(clave) else RESOLUCION[clave])
+        if minimo > maximo or resolucion <= 0:
+            raise ValueError(f"Límites no válidos para '{clave}': {limites}")
+        leidas.append((clave, minimo, maximo, resolucion))
+    return leidas
+
+
+# Valor i-ésimo de la rejilla de una variable (el último es siempre el máximo)
+def _valor(minimo, maximo, resolucion, i):
+    valor = min(minimo + i * resolucion, maximo)
+    return int(valor) if float(valor).is_integer() else valor
+
+
+def _n_pasos_rejilla(minimo, maximo, resolucion):
+    return math.ceil((maximo - minimo) / resolucion - 1e-9)
+
+
+# Evaluaciones memorizadas: (factible, paso del primer incumplimiento o None)
+class _Evaluador:
+    def __init__(self, config, max_camara):
+        self.config = config
+        self.max_camara = max_camara
+        self.n = pasos_por_hora(config)
+        self.evaluaciones = 0
+        self._memoria = {}
+
+    def _config(self, ajustes):
+        config = dict(self.config); config.update(ajustes)
+        return config
+
+    # Cámara por debajo de max_camara en todo el horizonte (sin simular los túneles)
+    def camara(self, ajustes):
+        clave = ("camara", tuple(sorted(ajustes.items())))
+        if clave not in self._memoria:
+            self.evaluaciones += 1
+            config = self._config(ajustes)
+            p = calcular_parametros(config)
+            camara, _, _, _ = balance_camara(HorarioCompilado(config, p, self.n), 0, p["duracion_total_real"] * self.n,
+                                             float(config.get("kg_iniciales_camara", 0)), 0.0)
+            exceso = (camara > self.max_camara + 0.01).nonzero()[0]
+            self._memoria[clave] = (len(exceso) == 0, int(exceso[0]) if len(exceso) else None)
+        return self._memoria[clave]
+
+    # Todo cabe en los túneles (la simulación se corta en el primer desborde)
+    def tuneles(self, ajustes):
+        clave = ("tuneles", tuple(sorted(ajustes.items())))
+        if clave not in self._memoria:
+            self.evaluaciones += 1
+            resultado = simulate(self._config(ajustes), registrar_tuneles=False, parar_en_desborde=True)
+            self._memoria[clave] = (resultado.paso_desborde is None, resultado.paso_desborde)
+        return self._memoria[clave]
+
+
+# Menor valor factible de una variable con las demás fijas, sabiendo que 'hasta' (índice de
+# la rejilla) es factible. Devuelve el índice.
+def _biseccion(evaluar, ajustes, variable, hasta):
+    clave, minimo, maximo, resolucion = variable
+    def factible(i):
+        return evaluar(dict(ajustes, **{clave: _valor(minimo, maximo, resolucion, i)}))[0]
+    if factible(0): return 0
+    bajo, alto = 0, hasta # bajo no factible, alto factible
+    while alto - bajo > 1:
+        medio = (bajo + alto) // 2
+        if factible(medio): alto = medio
+        else: bajo = medio
+    return alto
+
+
+def _coste(ajustes, variables, pesos):
+    return sum(pesos[clave] * ajustes[clave] for clave, *_ in variables)
+
+
+# Ajustes más baratos de una etapa (None si ni con todo al máximo es factible)
+def _optimizar_etapa(evaluar, fijas, variables, pesos):
+    if not variables: return dict(fijas)
+    principal, resto = variables[0], variables[1:]
+    tope = _n_pasos_rejilla(*principal[1:])
+    # Rejilla gruesa de las variables secundarias
+    puntos = max(2, int(MAX_PUNTOS_REJILLA ** (1 / len(resto)))) if resto else 1
+    rejillas = []
+    for clave, minimo, maximo, resolucion in resto:
+        n = _n_pasos_rejilla(minimo, maximo, resolucion)
+        rejillas.append(sorted({round(n * k / (puntos - 1)) for k in range(puntos)}) if n > 0 else [0])
+    mejor = None
+    for indices in itertools.product(*rejillas):
+        ajustes = dict(fijas, **{v[0]: _valor(*v[1:], i) for v, i in zip(resto, indices)})
+        if not evaluar(dict(ajustes, **{principal[0]: _valor(*principal[1:], tope)}))[0]: continue
+        ajustes[principal[0]] = _valor(*principal[1:], _biseccion(evaluar, ajustes, principal, tope))
+        if mejor is None or _coste(ajustes, variables, pesos) < _coste(mejor, variables, pesos): mejor = ajustes
+    if mejor is None: return None
+
+    # Afinado: cada variable por bisección desde su valor actual, hasta que ninguna baja
+    for _ in range(MAX_PASADAS):
+        cambio = False
+        for variable in variables:
+            clave, minimo, maximo, resolucion = variable
+            actual = _n_pasos_rejilla(minimo, mejor[clave], resolucion)
+            nuevo = _valor(minimo, maximo, resolucion, _biseccion(evaluar, mejor, variable, actual))
+            if nuevo < mejor[clave]: mejor[clave] = nuevo; cambio = True
+        if not cambio: break
+    return mejor
+
+
+# Ajustes más baratos de cajas y vaciado.
+#   variables: {clave: (minimo, maximo[, resolucion])}; claves "c_duracion", "c_linea_N",
+#              "c_duracion_extra", "c_kg_extra", "v_kg", "v_duracion", "v_kg_extra", "v_duracion_extra".
+#              La primera de cada etapa (cajas / vaciado) es la que se ajusta por bisección fina.
+#   max_camara: kg máximos en la cámara refrigerada (obligatorio si hay claves de cajas: con
+#               menos cajas siempre cabe más en los túneles, el límite lo pone la cámara).
+#   pesos: {clave: coste por unidad}; por defecto 1 / (maximo - minimo), todas pesan igual.
+# Devuelve {'factible', 'ajustes', 'coste', 'hora_limitante', 'evaluaciones'}. hora_limitante es
+# la hora del primer desborde (o exceso de cámara) si la primera variable bajara un escalón más;
+# si no es factible, la del primer desborde con todo al máximo.
+def optimizar_capacidad(config, variables, max_camara=None, pesos=None):
+    variables = _leer_variables(variables)
+    cajas = [v for v in variables if v[0] in CLAVES_CAJAS or _es_linea(v[0])]
+    vaciado = [v for v in variables if v[0] in CLAVES_VACIADO]
+    if cajas and max_camara is None:
+        raise ValueError("Para optimizar las cajas hace falta max_camara (kg máximos en la cámara)")
+    pesos = dict({clave: 1.0 / (maximo - minimo) if maximo > minimo else 0.0 for clave, minimo, maximo, _ in variables}, **(pesos or {}))
+    evaluador = _Evaluador(config, max_camara)
+
+    # Etapa 1: cajas contra la cámara (el vaciado, al máximo, no influye en ella)
+    etapas = ((evaluador.camara, cajas), (evaluador.tuneles, vaciado))
+    ajustes = {clave: maximo for clave, _, maximo, _ in variables}
+    for evaluar, grupo in etapas:
+        optimos = _optimizar_etapa(evaluar, {k: v for k, v in ajustes.items() if k not in {g[0] for g in grupo}}, grupo, pesos)
+        if optimos is None:
+            paso = evaluar(ajustes)[1]
+            return {'factible': False, 'ajustes': ajustes, 'coste': _coste(ajustes, variables, pesos),
+                    'hora_limitante': paso / evaluador.n if paso is not None else None, 'evaluaciones': evaluador.evaluaciones}
+        ajustes = optimos
+    # Las cajas ya elegidas pueden desbordar los túneles aunque no haya claves de vaciado
+    if not evaluador.tuneles(ajustes)[0]:
+        return {'factible': False, 'ajustes': ajustes, 'coste': _coste(ajustes, variables, pesos),
+                'hora_limitante': evaluador.tuneles(ajustes)[1] / evaluador.n, 'evaluaciones': evaluador.evaluaciones}
+
+    # Hora limitante: la primera variable de la última etapa, un escalón por debajo
+    hora_limitante = None
+    for evaluar, grupo in reversed(etapas):
+        if not grupo: continue
+        clave, minimo, maximo, resolucion = grupo[0]
+        if ajustes[clave] > minimo:
+            paso = evaluar(dict(ajustes, **{clave: _valor(minimo, maximo, resolucion, _n_pasos_rejilla(minimo, ajustes[clave], resolucion) - 1)}))[1]
+            if paso is not None: hora_limitante = paso / evaluador.n
+        break
+    return {'factible': True, 'ajustes': ajustes, 'coste': _coste(ajustes, variables, pesos),
+            'hora_limitante': hora_limitante, 'evaluaciones': evaluador.evaluaciones}
+
+
+# "clave=min:max[:resolucion]" -> (clave, (min, max[, resolucion]))
+def _leer_opcion_variable(texto):
+    clave, _, limites = texto.partition("=")
+    valores = []
+    for v in limites.split(":"):
+        num = float(v.strip())
+        valores.append(int(num) if num.is_integer() else num)
+    if len(valores) not in (2, 3):
+        raise argparse.ArgumentTypeError(f"Formato 'clave=min:max[:resolucion]': '{texto}'")
+    return clave.strip(), tuple(valores)
+
+
+def main(argv=None):
+    import time
+
+    from configuracion import argumento_config, cargar_config_cli
+
+    parser = argparse.ArgumentParser(description="Optimizador de capacidad de cajas y vaciado del gemelo digital")
+    parser.add_argument("-v", "--variable", action="append", default=[], help="clave=min:max[:resolucion] (se puede repetir; la primera de cada etapa se afina por bisección)")
+    argumento_config(parser)
+    parser.add_argument("--max-camara", type=float, default=None, help="Kg máximos en la cámara refrigerada (necesario para las claves de cajas)")
+    args = parser.parse_args(argv)
+
+    config = cargar_config_cli(parser, args.config)
+    if not args.variable:
+        parser.error("Indica al menos una variable con -v clave=min:max")
+
+    inicio = time.perf_counter()
+    try:
+        resultado = optimizar_capacidad(config, dict(_leer_opcion_variable(v) for v in args.variable), max_camara=args.max_camara)
+    except (ValueError, argparse.ArgumentTypeError) as e:
+        parser.error(str(e))
+    print(f"{resultado['evaluaciones']} evaluaciones en {time.perf_counter() - inicio:.1f} s")
+    print("Factible" if resultado['factible'] else "No factible ni con todo al máximo")
+    for clave, valor in resultado['ajustes'].items():
+        print(f"  {clave} = {valor}")
+    if resultado['hora_limitante'] is not None:
+        print(f"Hora limitante: {resultado['hora_limitante']:g}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+# -*- coding: utf-8 -*-
+# --- BANCO DE PRUEBAS DE RENDIMIENTO ---
+# Escenarios canónicos del motor (sin red ni Streamlit) con tiempo real, pasos por segundo,
+# memoria pico y bloques de memoria, más pruebas sueltas de Tunnel.add_kg y Tunnel.vaciar_kg
+# y del arranque en frío (importar el motor; primer dibujo de la app), con su presupuesto.
+# Cada ejecución se añade a un fichero JSON Lines junto con la versión del motor, para ver
+# las regresiones entre versiones (--comparar).
+#
+# Ejemplo:
+#   python rendimiento.py                          (todos los escenarios, guarda en rendimiento.jsonl)
+#   python rendimiento.py -e sitio_7d -e flota100_7d -r 3
+#   python rendimiento.py --comparar              (compara con la última versión distinta guardada)
+#   python rendimiento.py -e arranque_motor -e arranque_app
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from cache_resultados import version_motor
+from motor import simulate
+from tuneles import CARNE, HUESOS, Tunnel
+
+FICHERO_POR_DEFECTO = "rendimiento.jsonl"
+TOLERANCIA_REGRESION = 0.10 # Más de un 10 % más lento que la versión anterior
+# Segundos como máximo en un proceso nuevo (la salida es 1 si alguno se pasa)
+PRESUPUESTO_ARRANQUE = {"arranque_motor": 0.5, "arranque_app": 1.5}
+MODULOS_PESADOS = ("pandas", "altair", "pyarrow", "requests", "streamlit")
+PRUEBAS_SUELTAS = ("add_kg", "vaciar_kg", "arranque_motor", "arranque_app")
+
+# Planta actual (5 túneles por defecto), con valores típicos de la hoja
+CONFIG_BASE = dict(
+    duracion_simulacion=168, fecha_inicio=datetime.date(2025, 11, 3), kg_iniciales_camara=50000,
+    porcentaje_huesos=30, kg_pallet_huesos=1100, kg_pallet_carne=1250,
+    kg_iniciales_tunel_congelado=100000, kg_iniciales_tunel_frescos=80000, horas_restantes_congelacion=10,
+    d_inicio=6, d_cerdos=4000, d_velo=500, d_oee=85, d_peso=95, d_peso_despojos=8,
+    c_inicio=7, c_duracion=14, c_linea_0=2500, c_linea_1=2500, c_linea_2=2000, c_linea_3=2000, c_linea_4=1500, c_linea_5=1500, c_linea_6=1000,
+    p_inicio=8, p_duracion=8, p_kg=3000,
+    f_inicio=5, f_duracion=10, f_kg_dia=80000,
+    v_inicio=6, v_duracion=16, v_kg=8000,
+)
+
+
+# Flota sintética de k túneles (44, 55 o 66 palés) con los ritmos escalados a su capacidad
+def config_flota(k, base=CONFIG_BASE):
+    config = dict(base)
+    capacidad = 0
+    for i in range(k):
+        config[f"t_nombre_{i}"] = f"T{i:03d}"; config[f"t_pales_{i}"] = 44 + (i % 3) * 11
+        capacidad += config[f"t_pales_{i}"]
+    escala = capacidad / 355 # Palés de la planta actual
+    for clave in list(config):
+        if clave.startswith("c_linea_") or clave in ("d_cerdos", "p_kg", "f_kg_dia", "v_kg", "kg_iniciales_camara", "kg_iniciales_tunel_congelado", "kg_iniciales_tunel_frescos"):
+            config[clave] = config[clave] * escala
+    return config
+
+
+def _dias(dias, **cambios):
+    return dict(CONFIG_BASE, duracion_simulacion=24 * dias, **cambios)
+
+
+# {nombre: (config, opciones de simulate)}
+ESCENARIOS = {
+    "sitio_7d": (_dias(7), {}),
+    "sitio_30d": (_dias(30), {}),
+    "sitio_90d": (_dias(90), {}),
+    "sitio_7d_5min": (_dias(7, paso_minutos=5), {}),
+    "sitio_30d_5min": (_dias(30, paso_minutos=5), {}),
+    "saturado_30d": (_dias(30, v_kg=3000, v_duracion=8), {}),
+    "flota100_7d": (dict(config_flota(100), duracion_simulacion=168), {"registrar_tuneles": False}),
+}
+
+
+# Bloques de memoria vivos creados por f() (lo que queda tras la llamada, con gc parado)
+def _bloques(f):
+    gc.collect(); gc.disable()
+    try:
+        antes = sys.getallocatedblocks()
+        valor = f()
+        return valor, sys.getallocatedblocks() - antes
+    finally:
+        gc.enable()
+
+
+def medir_escenario(config, opciones, repeticiones=5):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = simulate(config, **opciones)
+        tiempos.append(time.perf_counter() - inicio)
+    del resultado
+    # Memoria en ejecuciones aparte (tracemalloc ralentiza)
+    _, bloques = _bloques(lambda: simulate(config, **opciones))
+    tracemalloc.start()
+    try:
+        resultado = simulate(config, **opciones)
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    mediana = statistics.median(tiempos)
+    pasos = resultado.n_pasos
+    return {
+        'tiempo_s': mediana, 'tiempo_min_s': min(tiempos), 'repeticiones': repeticiones,
+        'pasos': pasos, 'pasos_por_s': pasos / mediana if mediana > 0 else None,
+        'memoria_pico_mb': pico / 2**20, 'bloques_vivos': bloques,
+        'horas_saturacion': resultado.horas_saturacion(), # Comprobación: mismo escenario, mismo resultado
+    }
+
+
+# Tunnel.add_kg sobre un túnel que nunca se llena (lotes alternos de huesos y carne)
+def medir_add_kg(llamadas=20000):
+    t = Tunnel("BANCO", 10**7, 1, 1)
+    def llamar():
+        for i in range(llamadas):
+            t.add_kg(500.0, i, HUESOS if i % 2 else CARNE, 1100, 1250, force_mix=True)
+    inicio = time.perf_counter()
+    _, bloques = _bloques(llamar)
+    return {'llamadas': llamadas, 'us_por_llamada': (time.perf_counter() - inicio) / llamadas * 1e6, 'bloques_por_llamada': bloques / llamadas}
+
+
+# Tunnel.vaciar_kg sacando medio lote por llamada de un túnel lleno y ya congelado
+def medir_vaciar_kg(llamadas=20000):
+    t = Tunnel("BANCO", 10**7, 1, 1)
+    for i in range(llamadas // 2 + 1):
+        t.add_kg(500.0, 0, HUESOS if i % 2 else CARNE, 1100, 1250, force_mix=True)
+    def llamar():
+        for _ in range(llamadas):
+            t.vaciar_kg(250.0, 10**6)
+    inicio = time.perf_counter()
+    _, bloques = _bloques(llamar)
+    return {'llamadas': llamadas, 'us_por_llamada': (time.perf_counter() - inicio) / llamadas * 1e6, 'bloques_por_llamada': bloques / llamadas}
+
+
+# Código de los procesos de arranque: imprimen {tiempo, modulos_pesados, errores} en JSON
+_ARRANQUE_MOTOR = """
+import json, sys, time
+inicio = time.perf_counter()
+import motor
+tiempo = time.perf_counter() - inicio
+print(json.dumps({"tiempo": tiempo, "modulos_pesados": [m for m in %r if m in sys.modules], "errores": []}))
+"""
+_ARRANQUE_APP = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file(%r, default_timeout=60)
+inicio = time.perf_counter()
+app.run()
+tiempo = time.perf_counter() - inicio
+print(json.dumps({"tiempo": tiempo, "modulos_pesados": [m for m in %r if m in sys.modules and m != "streamlit"],
+                  "errores": [str(e.value) for e in app.exception]}))
+"""
+
+
+# CSV 'Parametro,Valor' de una configuración (el formato de la hoja)
+def _csv_config(config):
+    def valor(v):
+        if isinstance(v, bool): return "TRUE" if v else "FALSE"
+        if isinstance(v, datetime.date): return v.isoformat()
+        return str(v)
+    return "Parametro,Valor\n" + "".join(f"{clave},{valor(v)}\n" for clave, v in config.items())
+
+
+def _arranque(codigo, entorno=None):
+    directorio = os.path.dirname(os.path.abspath(__file__))
+    salida = subprocess.run([sys.executable, "-c", codigo], cwd=directorio, capture_output=True, text=True, timeout=300, env=dict(os.environ, **(entorno or {})))
+    if salida.returncode != 0:
+        raise RuntimeError(f"El proceso de arranque falló: {salida.stderr.strip().splitlines()[-1:]}")
+    return json.loads(salida.stdout.strip().splitlines()[-1])
+
+
+# Importar el motor en un proceso nuevo (lo que pagan los procesos por lotes)
+def medir_arranque_motor(repeticiones=5):
+    mediciones = [_arranque(_ARRANQUE_MOTOR % (MODULOS_PESADOS,)) for _ in range(repeticiones)]
+    return _registro_arranque("arranque_motor", mediciones)
+
+
+# Primer dibujo de la app en un proceso nuevo (Streamlit ya importado), con la configuración
+# en la copia local como en un servidor que ya la descargó alguna vez
+def medir_arranque_app(repeticiones=5):
+    from configuracion import GSHEET_URL
+
+    app = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gemelo_V1.py")
+    with tempfile.TemporaryDirectory() as directorio:
+        snapshot = os.path.join(directorio, "config_snapshot.json")
+        with open(snapshot, "w", encoding="utf-8") as f:
+            json.dump({"url": GSHEET_URL, "csv": _csv_config(CONFIG_BASE), "etag": None, "last_modified": None, "descargado": None}, f)
+        entorno = {"GEMELO_CONFIG_SNAPSHOT": snapshot}
+        mediciones = [_arranque(_ARRANQUE_APP % (app, MODULOS_PESADOS), entorno) for _ in range(repeticiones)]
+    return _registro_arranque("arranque_app", mediciones)
+
+
+def _registro_arranque(nombre, mediciones):
+    tiempos = [m["tiempo"] for m in mediciones]
+    mediana = statistics.median(tiempos)
+    return {
+        'tiempo_s': mediana, 'tiempo_min_s': min(tiempos), 'repeticiones': len(mediciones),
+        'presupuesto_s': PRESUPUESTO_ARRANQUE[nombre], 'dentro_presupuesto': mediana <= PRESUPUESTO_ARRANQUE[nombre],
+        'modulos_pesados': mediciones[-1]["modulos_pesados"], 'errores': mediciones[-1]["errores"],
+    }
+
+
+def _version_git():
+    try:
+        salida = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, timeout=5)
+        return salida.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+# Ejecuta los escenarios pedidos (por defecto todos) y las pruebas sueltas (túnel y arranque).
+# Devuelve una lista de registros {escenario, version_motor, ..., métricas}.
+def ejecutar_banco(nombres=None, repeticiones=5, on_progreso=None):
+    nombres = list(nombres or ESCENARIOS)
+    desconocidos = set(nombres) - set(ESCENARIOS) - set(PRUEBAS_SUELTAS)
+    if desconocidos:
+        raise ValueError(f"Escenarios desconocidos: {sorted(desconocidos)}")
+    comun = {
+        'fecha': datetime.datetime.now().isoformat(timespec="seconds"), 'version_motor': version_motor()[:12], 'git': _version_git(),
+        'python': platform.python_version(), 'maquina': platform.machine(), 'cpus': os.cpu_count(),
+    }
+    registros = []
+    for nombre in nombres + [n for n in PRUEBAS_SUELTAS if n not in nombres]:
+        if nombre == "add_kg": metricas = medir_add_kg()
+        elif nombre == "vaciar_kg": metricas = medir_vaciar_kg()
+        elif nombre == "arranque_motor": metricas = medir_arranque_motor(repeticiones)
+        elif nombre == "arranque_app": metricas = medir_arranque_app(repeticiones)
+        else: metricas = medir_escenario(*ESCENARIOS[nombre], repeticiones=repeticiones)
+        registros.append(dict(comun, escenario=nombre, **metricas))
+        if on_progreso: on_progreso(registros[-1])
+    return registros
+
+
+def guardar(registros, fichero=FICHERO_POR_DEFECTO):
+    with open(fichero, "a", encoding="utf-8") as f:
+        for r in registros:
+            f.write(json.dumps(r, ensure_ascii=False) + "\n")
+
+
+def leer(fichero=FICHERO_POR_DEFECTO):
+    if not os.path.exists(fichero): return []
+    with open(fichero, encoding="utf-8") as f:
+        return [json.loads(linea) for linea in f if linea.strip()]
+
+
+# Compara cada registro con el último guardado del mismo escenario y otra versión del motor.
+# Devuelve [(escenario, métrica, anterior, actual, cociente, regresión)].
+def comparar(registros, anteriores, tolerancia=TOLERANCIA_REGRESION):
+    comparacion = []
+    for r in registros:
+        previos = [a for a in anteriores if a['escenario'] == r['escenario'] and a['version_motor'] != r['version_motor']]
+        if not previos: continue
+        previo = previos[-1]
+        metrica = 'us_por_llamada' if 'us_por_llamada' in r else 'tiempo_s'
+        cociente = r[metrica] / previo[metrica] if previo[metrica] else None
+        comparacion.append((r['escenario'], metrica, previo[metrica], r[metrica], cociente, cociente is not None and cociente > 1 + tolerancia))
+    return comparacion
+
+
+def _formatear(r):
+    if 'us_por_llamada' in r:
+        return f"{r['escenario']:<16} {r['us_por_llamada']:9.2f} us/llamada  {r['bloques_por_llamada']:6.2f} bloques/llamada"
+    if 'presupuesto_s' in r:
+        return (f"{r['escenario']:<16} {r['tiempo_s'] * 1000:9.1f} ms  (presupuesto {r['presupuesto_s'] * 1000:.0f} ms)"
+                f"{'' if r['dentro_presupuesto'] else '  FUERA DE PRESUPUESTO'}  pesados: {', '.join(r['modulos_pesados']) or '-'}"
+                + (f"  errores: {r['errores']}" if r['errores'] else ""))
+    return (f"{r['escenario']:<16} {r['tiempo_s'] * 1000:9.1f} ms  {r['pasos_por_s']:10.0f} pasos/s  "
+            f"{r['memoria_pico_mb']:7.1f} MB pico  {r['bloques_vivos']:8d} bloques")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Banco de pruebas de rendimiento del motor del gemelo digital")
+    parser.add_argument("-e", "--escenario", action="append", default=None, help=f"Escenario (se puede repetir): {', '.join([*ESCENARIOS, *PRUEBAS_SUELTAS])}")
+    parser.add_argument("-r", "--repeticiones", type=int, default=5)
+    parser.add_argument("-f", "--fichero", default=FICHERO_POR_DEFECTO, help="Fichero JSON Lines de resultados")
+    parser.add_argument("--no-guardar", action="store_true", help="No añadir los resultados al fichero")
+    parser.add_argument("--comparar", action="store_true", help="Comparar con la última versión distinta del fichero")
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA_REGRESION, help="Fracción más lenta que cuenta como regresión")
+    args = parser.parse_args(argv)
+
+    anteriores = leer(args.fichero) if args.comparar else []
+    try:
+        registros = ejecutar_banco(args.escenario, args.repeticiones, on_progreso=lambda r: print(_formatear(r), flush=True))
+    except ValueError as e:
+        parser.error(str(e))
+    if not args.no_guardar:
+        guardar(registros, args.fichero)
+    if args.comparar:
+        comparacion = comparar(registros, anteriores, args.tolerancia)
+        if not comparacion: print("Sin resultados de otra versión del motor para comparar")
+        for escenario, metrica, anterior, actual, cociente, regresion in comparacion:
+            print(f"{escenario:<16} {metrica}: {anterior:.4g} -> {actual:.4g} (x{cociente:.2f}){'  REGRESIÓN' if regresion else ''}")
+        if any(c[-1] for c in comparacion): sys.exit(1)
+    if not all(r.get('dentro_presupuesto', True) for r in registros): sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+# FuenteConfig contra un servidor HTTP local que hace de hoja publicada: respuesta 200 con ETag,
+# 304 en las peticiones condicionales, errores y hoja lenta (timeout). La copia local y la
+# configuración en uso no deben perderse cuando la descarga falla.
+import http.server
+import json
+import threading
+import time
+
+import pytest
+
+from configuracion import FuenteConfig
+
+CSV_V1 = 'Parametro,Valor\nduracion_simulacion,"168"\nporcentaje_huesos,"30"\n'
+CSV_V2 = 'Parametro,Valor\nduracion_simulacion,"72"\nporcentaje_huesos,"30"\n'
+
+
+class Hoja(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        estado = self.server.estado
+        with estado["lock"]:
+            estado["peticiones"].append(dict(self.headers))
+            estado["activas"] += 1; estado["max_activas"] = max(estado["max_activas"], estado["activas"])
+        try:
+            time.sleep(estado["retraso"])
+            if estado["status"] != 200:
+                self.send_response(estado["status"]); self.end_headers()
+            elif self.headers.get("If-None-Match") == estado["etag"]:
+                self.send_response(304); self.send_header("ETag", estado["etag"]); self.end_headers()
+            else:
+                cuerpo = estado["csv"].encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/csv; charset=utf-8")
+                self.send_header("Content-Length", str(len(cuerpo)))
+                self.send_header("ETag", estado["etag"])
+                self.end_headers(); self.wfile.write(cuerpo)
+        except (BrokenPipeError, ConnectionResetError): # El cliente se cansó de esperar
+            pass
+        finally:
+            with estado["lock"]: estado["activas"] -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def hoja():
+    servidor = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Hoja)
+    servidor.daemon_threads = True
+    servidor.estado = {"csv": CSV_V1, "etag": '"v1"', "status": 200, "retraso": 0.0, "peticiones": [],
+                       "activas": 0, "max_activas": 0, "lock": threading.Lock()}
+    servidor.url = f"http://127.0.0.1:{servidor.server_address[1]}/hoja.csv"
+    hilo = threading.Thread(target=servidor.serve_forever, daemon=True); hilo.start()
+    yield servidor
+    servidor.shutdown(); servidor.server_close()
+
+
+def leer_copia(ruta):
+    with open(ruta, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_descarga_200_guarda_copia_con_etag(hoja, tmp_path):
+    copia = tmp_path / "snapshot.json"
+    fuente = FuenteConfig(hoja.url, snapshot=str(copia), timeout=2)
+    config, error = fuente.obtener()
+    assert error is None and config["duracion_simulacion"] == 168
+    assert fuente.origen == "hoja" and fuente.version == 1
+    datos = leer_copia(copia)
+    assert datos["csv"] == CSV_V1 and datos["etag"] == '"v1"' and datos["url"] == hoja.url
+
+    # Al arrancar de nuevo se usa la copia local sin esperar a la red
+    otra = FuenteConfig(hoja.url, snapshot=str(copia), timeout=2)
+    assert otra.origen == "copia local" and otra.config == fuente.config and otra._etag == '"v1"'
+
+
+def test_304_no_cambia_nada(hoja, tmp_path):
+    copia = tmp_path / "snapshot.json"
+    fuente = FuenteConfig(hoja.url, snapshot=str(copia), timeout=2)
+    assert fuente.refrescar()
+    antes = leer_copia(copia)
+    assert not fuente.refrescar()
+    assert hoja.estado["peticiones"][-1].get("If-None-Match") == '"v1"'
+    assert fuente.version == 1 and fuente.error is None
+    assert leer_copia(copia) == antes
+
+    # Hoja nueva: cambia la configuración y la copia lleva el ETag nuevo
+    hoja.estado.update(csv=CSV_V2, etag='"v2"')
+    assert fuente.refrescar()
+    assert fuente.config["duracion_simulacion"] == 72 and fuente.version == 2
+    datos = leer_copia(copia)
+    assert datos["csv"] == CSV_V2 and datos["etag"] == '"v2"'
+
+
+@pytest.mark.parametrize("fallo", ["timeout", "500", "vacia"])
+def test_error_conserva_configuracion_y_copia(hoja, tmp_path, fallo):
+    copia = tmp_path / "snapshot.json"
+    fuente = FuenteConfig(hoja.url, snapshot=str(copia), timeout=(2, 0.2))
+    assert fuente.refrescar()
+    antes = leer_copia(copia); config = dict(fuente.config)
+
+    if fallo == "timeout": hoja.estado.update(csv=CSV_V2, etag='"v2"', retraso=1.0)
+    elif fallo == "500": hoja.estado.update(status=500)
+    else: hoja.estado.update(csv="Parametro,Valor\n", etag='"v3"')
+    assert not fuente.refrescar()
+    assert fuente.error
+    assert fuente.config == config and fuente.version == 1 and fuente._etag == '"v1"'
+    assert leer_copia(copia) == antes
+    assert fuente.obtener() == (config, None) # Sigue sirviendo la versión anterior
+
+    # Al recuperarse la hoja se limpia el error
+    hoja.estado.update(csv=CSV_V1, etag='"v1"', status=200, retraso=0.0)
+    assert not fuente.refrescar() and fuente.error is None
+
+
+def test_refrescos_simultaneos_van_de_uno_en_uno(hoja, tmp_path):
+    copia = tmp_path / "snapshot.json"
+    fuente = FuenteConfig(hoja.url, snapshot=str(copia), timeout=2, intervalo=0)
+    assert fuente.refrescar()
+    hoja.estado.update(csv=CSV_V2, etag='"v2"', retraso=0.2)
+    fuente.refrescar_en_segundo_plano() # Hilo de refresco y "Recargar" a la vez
+    fuente.refrescar()
+    fuente._hilo.join(5)
+    assert hoja.estado["max_activas"] == 1
+    # El segundo refresco ya pregunta con el ETag que dejó el primero
+    assert [p.get("If-None-Match") for p in hoja.estado["peticiones"][1:]] == ['"v1"', '"v2"']
+    assert fuente.version == 2 and fuente._etag == '"v2"'
+    datos = leer_copia(copia)
+    assert datos["csv"] == CSV_V2 and datos["etag"] == '"v2"'
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+# Monte Carlo con un calendario más largo que duracion_simulacion: cada día simulado tiene su
+# propio valor muestreado (sin repetir el último día muestreado hasta el final).
+import pandas as pd
+
+import montecarlo
+from montecarlo import ejecutar_montecarlo
+from motor import calcular_parametros, simulate
+
+CALENDARIO = "N,N,E,N,N,P,N,N,N,N"
+
+
+def test_muestrea_todos_los_dias_del_calendario(config_base, monkeypatch):
+    config = dict(config_base, duracion_simulacion=48, calendario=CALENDARIO, d_extra_check=True)
+    assert calcular_parametros(config)["duracion_total_real"] == 240
+    lanzados = []
+    def ejecutar_escenarios(config_base, escenarios, procesos=None):
+        lanzados.extend(escenarios)
+        return pd.DataFrame(escenarios)
+    monkeypatch.setattr(montecarlo, "ejecutar_escenarios", ejecutar_escenarios)
+
+    ejecutar_montecarlo(config, 5, {"d_cerdos": ("uniforme", 3000, 5000)}, semilla=1)
+    assert len(lanzados) == 5
+    for escenario in lanzados:
+        valores = escenario["por_dia"]["d_cerdos"]
+        assert len(valores) == 10 and len(set(valores)) == 10
+
+
+def test_replicas_usan_los_dias_finales(config_base):
+    config = dict(config_base, duracion_simulacion=48, calendario=CALENDARIO, kg_iniciales_tunel_congelado=0, kg_iniciales_tunel_frescos=0)
+    distribuciones = {"d_cerdos": ("uniforme", 2000, 6000)}
+    df = ejecutar_montecarlo(config, 3, distribuciones, semilla=7, procesos=1)
+    assert df['Error'].isna().all()
+    # Misma réplica a mano: los cerdos de los días 4-10 cambian el resultado
+    muestras = montecarlo.muestrear_replicas(distribuciones, 3, 10, semilla=7)["d_cerdos"]
+    for i in range(3):
+        resultado = simulate(dict(config, por_dia={"d_cerdos": muestras[i].tolist()}), registrar_tuneles=False)
+        repetido = simulate(dict(config, por_dia={"d_cerdos": muestras[i][:3].tolist()}), registrar_tuneles=False)
+        assert df['Pico Kg Congelar Fuera'][i] == resultado.pico('Kg Congelar Fuera')
+        assert resultado.resumen_diario != repetido.resumen_diario
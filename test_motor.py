@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+# Invariantes del motor sobre configuraciones aleatorias (calendario, turnos extra, pasos de
+# 60/15/5 min): simulate(por_eventos=True) da los mismos inventarios y resumen diario que
+# recorrer todos los pasos, reanudar desde un PuntoControl reproduce la simulación completa e
+# iterar_simulacion entrega las mismas filas que simulate.
+import json
+import random
+
+import numpy as np
+import pytest
+
+from motor import COLUMNAS_HISTORIAL, PuntoControl, iterar_simulacion, punto_control_inicial, simulate
+
+PASOS_MINUTOS = (60, 15, 5)
+
+
+def config_aleatoria(base, semilla):
+    azar = random.Random(semilla)
+    config = dict(base, paso_minutos=PASOS_MINUTOS[semilla % len(PASOS_MINUTOS)],
+                  duracion_simulacion=azar.choice((48, 72, 100, 168)), porcentaje_huesos=azar.choice((0, 30, 60, 100)),
+                  d_cerdos=azar.randint(1500, 6000), f_kg_dia=azar.choice((40000, 80000)),
+                  v_kg=azar.choice((3000, 8000, 20000)), v_duracion=azar.choice((8, 16)),
+                  kg_iniciales_tunel_congelado=azar.choice((0, 100000, 900000)), kg_iniciales_tunel_frescos=azar.choice((0, 80000)),
+                  horas_restantes_congelacion=azar.choice((0, 10, 32)))
+    for proceso in "dcpfv":
+        config[f"{proceso}_extra_check"] = azar.random() < 0.4
+    if semilla % 2: # Calendario explícito (fija la duración)
+        config["calendario"] = ",".join(azar.choice("NNNEP") for _ in range(azar.randint(2, 8)))
+    if azar.random() < 0.3:
+        config["dias_parados"] = "sábado,domingo"
+    if azar.random() < 0.3:
+        config["por_dia"] = {"d_cerdos": [azar.randint(1000, 6000) for _ in range(3)], "porcentaje_huesos": [azar.choice((10, 30, 60))]}
+    return config
+
+
+# Filas de `completo` (todos los pasos) con los mismos pasos que `parcial`
+def filas_de(completo, parcial):
+    filas = np.searchsorted(completo.columnas['paso'], parcial.columnas['paso'])
+    assert np.array_equal(completo.columnas['paso'][filas], parcial.columnas['paso'])
+    return filas
+
+
+@pytest.mark.parametrize("semilla", range(18))
+def test_por_eventos_mismos_inventarios(config_base, semilla):
+    config = config_aleatoria(config_base, semilla)
+    todos = simulate(config)
+    eventos = simulate(config, por_eventos=True)
+    filas = filas_de(todos, eventos)
+    for columna, valores in eventos.columnas.items():
+        assert np.array_equal(todos.columnas[columna][filas], valores), columna
+    assert np.array_equal(todos.estados_tuneles[filas], eventos.estados_tuneles)
+    assert np.array_equal(todos.afinidades_tuneles[filas], eventos.afinidades_tuneles)
+    assert eventos.resumen_diario == todos.resumen_diario
+    assert eventos.punto_control.a_dict() == todos.punto_control.a_dict()
+
+
+@pytest.mark.parametrize("por_eventos", [False, True])
+@pytest.mark.parametrize("semilla", range(6))
+def test_iterar_simulacion_igual_que_simulate(config_base, semilla, por_eventos):
+    config = config_aleatoria(config_base, semilla)
+    resultado = simulate(config, por_eventos=por_eventos)
+    filas = list(iterar_simulacion(config, por_eventos=por_eventos))
+    assert len(filas) == resultado.filas
+    for columna in COLUMNAS_HISTORIAL:
+        assert [f[columna] for f in filas] == resultado.columnas[columna].tolist(), columna
+    assert [f['datetime'] for f in filas] == [resultado.fecha(paso) for paso in resultado.columnas['paso']]
+    assert [list(f['tuneles']) for f in filas] == [resultado.estado_tuneles(i) for i in range(resultado.filas)]
+    # Los flujos del paso cuadran con los inventarios de filas consecutivas
+    for anterior, fila in zip(filas, filas[1:]):
+        if fila['paso'] != anterior['paso'] + 1: continue
+        camara = anterior['Kg Cámara Refrigerado'] + fila['kg_despiece_paso'] - fila['kg_cajas_paso'] - fila['kg_placas_paso'] - fila['kg_fresco_paso']
+        tuneles = anterior['Kg en Túneles (Total)'] + fila['kg_cajas_paso'] - fila['kg_desborde_paso'] - fila['kg_vaciado_paso']
+        assert camara == pytest.approx(fila['Kg Cámara Refrigerado'], abs=1e-5)
+        assert tuneles == pytest.approx(fila['Kg en Túneles (Total)'], abs=1e-5)
+    assert all(f['tuneles'] is None for f in iterar_simulacion(config, registrar_tuneles=False, hasta_hora=30))
+
+
+# Reanudar da los mismos pasos, días y afinidades; los kg pueden diferir en redondeos (~1e-9 kg):
+# balance_camara empieza sus sumas acumuladas en el paso del punto de control
+def mismo_resultado(a, b):
+    assert a.columnas.keys() == b.columnas.keys()
+    assert np.array_equal(a.columnas['paso'], b.columnas['paso']) and np.array_equal(a.columnas['es_dia_extra'], b.columnas['es_dia_extra'])
+    for columna in a.columnas:
+        np.testing.assert_allclose(a.columnas[columna], b.columnas[columna], rtol=0, atol=1e-6, err_msg=columna)
+    np.testing.assert_allclose(a.estados_tuneles, b.estados_tuneles, rtol=0, atol=1e-6)
+    assert np.array_equal(a.afinidades_tuneles, b.afinidades_tuneles)
+    assert [r['Día'] for r in a.resumen_diario] == [r['Día'] for r in b.resumen_diario]
+    for ra, rb in zip(a.resumen_diario, b.resumen_diario):
+        assert ra == pytest.approx(rb, rel=0, abs=1e-6)
+
+
+# Une el historial de la primera parte y el de la reanudación
+class Unido:
+    def __init__(self, primera, resto):
+        self.columnas = {c: np.concatenate([primera.columnas[c], resto.columnas[c]]) for c in primera.columnas}
+        self.estados_tuneles = np.concatenate([primera.estados_tuneles, resto.estados_tuneles])
+        self.afinidades_tuneles = np.concatenate([primera.afinidades_tuneles, resto.afinidades_tuneles])
+        self.resumen_diario = resto.resumen_diario
+
+
+@pytest.mark.parametrize("por_eventos", [False, True])
+@pytest.mark.parametrize("semilla", range(6))
+def test_reanudar_desde_punto_control(config_base, semilla, por_eventos):
+    config = config_aleatoria(config_base, semilla)
+    n = 60 // config["paso_minutos"]
+    completo = simulate(config, por_eventos=por_eventos)
+    total = completo.duracion_total_real
+    for hora in sorted({0, 1, 7, 24, 30, total // 2, total - 1, total}):
+        primera = simulate(config, por_eventos=por_eventos, hasta_hora=hora)
+        punto = PuntoControl.desde_dict(json.loads(json.dumps(primera.punto_control.a_dict())))
+        assert punto.paso == hora * n
+        resto = simulate(config, por_eventos=por_eventos, desde=punto)
+        mismo_resultado(Unido(primera, resto), completo)
+        assert len(primera.resumen_diario) <= len(resto.resumen_diario)
+        # Cada reanudación crea sus propios túneles: el punto de control se puede reutilizar
+        otra = simulate(config, por_eventos=por_eventos, desde=punto)
+        assert all(np.array_equal(otra.columnas[c], resto.columnas[c]) for c in resto.columnas)
+        assert otra.punto_control.a_dict() == resto.punto_control.a_dict()
+
+
+def test_punto_control_inicial(config_base):
+    config = dict(config_base, kg_iniciales_tunel_congelado=0, kg_iniciales_tunel_frescos=0,
+                  t_nombre_0="A", t_pales_0=20, t_nombre_1="B", t_pales_1=20, t_productos_1="Carne")
+    punto = punto_control_inicial(config, {"A": [("Congelado", 11000, 10, 0), ("Huesos", 5500, 5, 6)], "B": [("Carne", 12500, 10, 20)]})
+    assert punto.kg_tuneles == 29000 and punto.pallets_tuneles == 25
+    resultado = simulate(config, desde=punto)
+    assert resultado.columnas['Kg en Túneles (Total)'][0] >= 0
+    with pytest.raises(ValueError, match="desconocidos"):
+        punto_control_inicial(config, {"C": []})
+    with pytest.raises(ValueError, match="no caben"):
+        punto_control_inicial(config, {"A": [("Huesos", 22000, 21, 5)]})
+    with pytest.raises(ValueError, match="no admite"):
+        punto_control_inicial(config, {"B": [("Huesos", 1100, 1, 5)]})
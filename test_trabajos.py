@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+# TrabajosSimulacion: las sesiones con la misma configuración comparten un trabajo, que solo se
+# cancela cuando lo dejan todas; uno cancelado se sustituye al relanzar y no deja resultado en
+# la caché.
+import threading
+
+import pytest
+
+from cache_resultados import CacheResultados
+from trabajos import CANCELADO, ERROR, TERMINADO, TrabajosSimulacion
+
+
+# Cada simulación se queda en su primer aviso de progreso hasta que se suelta
+class CacheRetenida(CacheResultados):
+    def __init__(self):
+        super().__init__()
+        self.en_marcha = threading.Event()
+        self.soltar = threading.Event()
+
+    def simular(self, config, diagnostico=None, on_progreso=None, **opciones):
+        def retener(fraccion):
+            self.en_marcha.set()
+            self.soltar.wait(10)
+            on_progreso(fraccion)
+        return super().simular(config, diagnostico, retener, **opciones)
+
+
+@pytest.fixture
+def config(config_base):
+    return dict(config_base, duracion_simulacion=48)
+
+
+@pytest.fixture
+def trabajos():
+    return TrabajosSimulacion(CacheRetenida())
+
+
+def test_sesiones_comparten_trabajo(trabajos, config):
+    a = trabajos.lanzar(config, "a")
+    b = trabajos.lanzar(dict(config), "b")
+    assert a is b and a.sesiones == {"a", "b"}
+    assert trabajos.cache.en_marcha.wait(10)
+    trabajos.cache.soltar.set()
+    assert a.esperar(10)
+    assert a.estado == TERMINADO and a.resultado is not None and a.progreso == 1.0
+    assert (trabajos.cache.aciertos, trabajos.cache.fallos) == (0, 1)
+    assert trabajos.en_curso() == []
+
+    # Terminado: el siguiente lanzamiento es otro trabajo que sale de la caché
+    c = trabajos.lanzar(config, "a")
+    assert c is not a and c.esperar(10)
+    assert c.estado == TERMINADO and c.resultado is a.resultado
+    assert (trabajos.cache.aciertos, trabajos.cache.fallos) == (1, 1)
+
+
+def test_cancelar_solo_cuando_no_lo_sigue_nadie(trabajos, config):
+    trabajo = trabajos.lanzar(config, "a"); trabajos.lanzar(config, "b")
+    assert trabajos.cache.en_marcha.wait(10)
+    trabajos.cancelar(trabajo, "a")
+    assert not trabajo.cancelado() and trabajo.sesiones == {"b"}
+    trabajos.cancelar(trabajo, "b")
+    assert trabajo.cancelado() and trabajo.sesiones == set()
+
+    # Relanzar la misma configuración no reutiliza el trabajo cancelado
+    nuevo = trabajos.lanzar(config, "a")
+    assert nuevo is not trabajo and nuevo.sesiones == {"a"} and not nuevo.cancelado()
+    trabajos.cache.soltar.set()
+    assert trabajo.esperar(10) and nuevo.esperar(10)
+    assert trabajo.estado == CANCELADO and trabajo.resultado is None
+    assert nuevo.estado == TERMINADO and nuevo.resultado is not None
+    # Solo el trabajo que terminó guardó su resultado
+    assert (trabajos.cache.aciertos, trabajos.cache.fallos) == (0, 2) and len(trabajos.cache._memoria) == 1
+
+
+def test_cancelado_no_guarda_en_cache(trabajos, config):
+    trabajo = trabajos.lanzar(config, "a")
+    assert trabajos.cache.en_marcha.wait(10)
+    trabajos.cancelar(trabajo, "a")
+    trabajos.cache.soltar.set()
+    assert trabajo.esperar(10)
+    assert trabajo.estado == CANCELADO and trabajo.resultado is None and trabajo.error is None
+    assert len(trabajos.cache._memoria) == 0 and trabajos.en_curso() == []
+
+
+def test_reiniciar_y_error(trabajos, config):
+    trabajos.cache.soltar.set()
+    anterior = trabajos.lanzar(config, "a")
+    erroneo = trabajos.reiniciar(anterior, dict(config, paso_minutos=7), "a")
+    assert erroneo is not anterior and anterior.sesiones == set() and anterior.cancelado()
+    assert anterior.esperar(10) and erroneo.esperar(10)
+    assert erroneo.estado == ERROR and "paso_minutos" in erroneo.error
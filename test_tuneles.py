@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+# Afinidad de Tunnel con los contadores por producto (O(1)) frente a la reconstrucción con un
+# conjunto de los productos en cola (la implementación anterior), paso a paso; y
+# DespachadorTuneles (índices por producto y montículo de horas) frente a recorrer todos los
+# túneles en orden en cada pasada de cajas y de vaciado.
+import math
+import random
+
+import pytest
+
+from tuneles import CARNE, CONGELADO, HUESOS, NOMBRES_AFINIDAD, NOMBRES_PRODUCTO, SIN_AFINIDAD, AFINIDAD_MIXTA, DespachadorTuneles, Tunnel
+
+
+def afinidad_por_conjunto(tunel):
+    tipos = {l.producto for l in tunel.queue if l.producto != CONGELADO}
+    if not tipos: return NOMBRES_AFINIDAD[SIN_AFINIDAD]
+    if len(tipos) == 1: return NOMBRES_AFINIDAD[tipos.pop()]
+    return NOMBRES_AFINIDAD[AFINIDAD_MIXTA]
+
+
+def comprobar(tunel):
+    assert tunel.affinity == afinidad_por_conjunto(tunel)
+    assert tunel._lotes_por_producto == [sum(l.producto == p for l in tunel.queue) for p in (HUESOS, CARNE)]
+
+
+@pytest.mark.parametrize("semilla", range(20))
+def test_afinidad_secuencias_aleatorias(semilla):
+    azar = random.Random(semilla)
+    tunel = Tunnel("T", 44, 11, 4)
+    if semilla % 2: # Con inventario inicial congelado y fresco al frente
+        tunel.add_initial_kg(8000, -999, 30, 1100, 1250)
+        tunel.add_initial_kg(6000, -5, 30, 1100, 1250)
+    comprobar(tunel)
+    for hora in range(300):
+        accion = azar.random()
+        if accion < 0.5:
+            producto = azar.choice((HUESOS, CARNE, NOMBRES_PRODUCTO[HUESOS], NOMBRES_PRODUCTO[CARNE]))
+            tunel.add_kg(azar.uniform(100, 6000), hora, producto, 1100, 1250, force_mix=azar.random() < 0.3)
+        elif accion < 0.9: # Vaciados parciales del primer lote (y a veces de varios)
+            tunel.vaciar_kg(azar.uniform(10, 4000), hora + azar.choice((0, 20, 40)))
+        else: # Vaciar el túnel entero
+            tunel.vaciar_kg(10**9, 10**6)
+            assert not tunel.queue and tunel.affinity == NOMBRES_AFINIDAD[SIN_AFINIDAD]
+        comprobar(tunel)
+
+
+def test_afinidad_vaciado_parcial_y_total():
+    tunel = Tunnel("T", 44, 11, 4)
+    tunel.add_kg(2200, 0, HUESOS, 1100, 1250)
+    comprobar(tunel); assert tunel.affinity == "Huesos"
+    assert tunel.add_kg(1250, 0, CARNE, 1100, 1250) == 1250 # Sin forzar mezcla no entra
+    tunel.add_kg(1250, 1, CARNE, 1100, 1250, force_mix=True)
+    comprobar(tunel); assert tunel.affinity == "Mixed"
+    tunel.vaciar_kg(1000, 100) # Parte del lote de huesos: sigue mixto
+    comprobar(tunel); assert tunel.affinity == "Mixed"
+    tunel.vaciar_kg(1200, 100) # Sale el lote de huesos entero
+    comprobar(tunel); assert tunel.affinity == "Carne"
+    tunel.vaciar_kg(10**6, 100)
+    comprobar(tunel); assert tunel.affinity == "None"
+
+
+# --- DESPACHADOR ---
+# Flotas: (definiciones, kg/h máximos de cajas, kg/h máximos de vaciado)
+def flota(tipo, azar):
+    if tipo == "grande":
+        definiciones = [(f"T{i:03d}", azar.choice((22, 44, 55)), 11, 4) for i in range(80)]
+    elif tipo == "saturada": # Entra mucho más de lo que se vacía: casi siempre llena
+        definiciones = [(f"T{i}", azar.choice((8, 12, 20)), 4, 4) for i in range(4)]
+    else: # Túneles dedicados a un producto y con horas de congelación propias
+        definiciones = [(f"T{i:02d}", azar.choice((20, 44)), 11, 4, (azar.choice((12, 18)), azar.choice((24, 33))), azar.choice(((HUESOS,), (CARNE,), (HUESOS, CARNE))))
+                        for i in range(12)]
+    pallets = sum(d[1] for d in definiciones)
+    if tipo == "saturada": return definiciones, pallets * 600, pallets * 30
+    return definiciones, pallets * 80, pallets * 60
+
+
+def repartir_en_orden(tuneles, kg, hora, producto, force_mix):
+    for t in tuneles:
+        if kg > 0.01: kg = t.add_kg(kg, hora, producto, 1100, 1250, force_mix=force_mix)
+    return kg
+
+
+def vaciar_en_orden(tuneles, kg, hora):
+    for t in tuneles:
+        if kg <= 0.01: break
+        kg -= t.vaciar_kg(kg, hora)
+    return kg
+
+
+@pytest.mark.parametrize("tipo", ["grande", "saturada", "dedicada"])
+@pytest.mark.parametrize("semilla", range(6))
+def test_despachador_igual_que_recorrer_en_orden(tipo, semilla):
+    azar = random.Random(semilla)
+    definiciones, kg_cajas, kg_vaciado = flota(tipo, azar)
+    tuneles = [Tunnel(*d) for d in definiciones]; referencia = [Tunnel(*d) for d in definiciones]
+    if semilla % 2: # Inventario inicial: congelado y fresco a medio congelar
+        for flota_ in (tuneles, referencia):
+            for t in flota_[:3]:
+                t.add_initial_kg(15000, -999, 30, 1100, 1250)
+                t.add_initial_kg(12000, -10, 30, 1100, 1250)
+    despacho = DespachadorTuneles(tuneles)
+    ultimo_vaciado = -math.inf # Los lotes ya congelados están listos desde el principio
+    for hora in range(1, 300):
+        if azar.random() < 0.7: # Cajas: dos pasadas por producto, como en el motor
+            kg = azar.uniform(0, kg_cajas); pct_huesos = azar.choice((0, 0.3, 0.7, 1))
+            pendientes = {HUESOS: kg * pct_huesos, CARNE: kg * (1 - pct_huesos)}
+            for force_mix in (False, True):
+                for producto in (HUESOS, CARNE):
+                    quedan = despacho.repartir(pendientes[producto], hora, producto, 1100, 1250, force_mix=force_mix)
+                    assert quedan == repartir_en_orden(referencia, pendientes[producto], hora, producto, force_mix)
+                    pendientes[producto] = quedan
+        if azar.random() < 0.6:
+            kg = azar.uniform(0, kg_vaciado)
+            assert despacho.vaciar(kg, hora) == vaciar_en_orden(referencia, kg, hora)
+            ultimo_vaciado = hora
+        assert [t.exportar_estado() for t in tuneles] == [t.exportar_estado() for t in referencia]
+        assert despacho.kg_total == pytest.approx(sum(t.kg_actual for t in referencia), abs=1e-6)
+        assert despacho.pallets_total == pytest.approx(sum(t.pallets_actual for t in referencia), abs=1e-6)
+        horas_listas = [t.queue[0].hora_lista for t in referencia if t.queue]
+        minima = despacho.hora_lista_minima()
+        if minima == -math.inf: # Algún túnel quedó listo en un vaciado y aún tiene ese primer lote
+            assert horas_listas and min(horas_listas) <= ultimo_vaciado
+        else:
+            assert minima == (min(horas_listas) if horas_listas else None)
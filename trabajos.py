@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+# --- SIMULACIONES EN SEGUNDO PLANO (sin Streamlit) ---
+# La app lanza cada simulación en un hilo de TrabajosSimulacion (uno por servidor, compartido
+# con st.cache_resource) y solo consulta su progreso: la interfaz no se bloquea mientras se
+# calcula y pulsar un botón (que relanza el script) no aborta el cálculo.
+# Las sesiones que piden la misma configuración (misma clave que CacheResultados) comparten un
+# único trabajo, que solo se cancela cuando lo cancelan todas las sesiones que lo siguen.
+# El resultado queda además en la caché de resultados.
+import threading
+import time
+
+import motor
+from cache_resultados import CacheResultados, clave_config
+from diagnostico import Diagnostico
+
+# Estados de un trabajo
+EN_COLA, EN_CURSO, TERMINADO, CANCELADO, ERROR = "en cola", "en curso", "terminado", "cancelado", "error"
+
+
+class SimulacionCancelada(Exception):
+    pass
+
+
+class Trabajo:
+    def __init__(self, clave, config, opciones, diagnostico=None):
+        self.clave = clave
+        self.config = config
+        self.opciones = opciones
+        self.estado = EN_COLA
+        self.progreso = 0.0 # Fracción de pasos simulados
+        self.resultado = None
+        self.error = None
+        self.diagnostico = diagnostico # Propio del trabajo: la sesión lo combina con el suyo al acabar
+        self.sesiones = set() # Sesiones que siguen el trabajo
+        self.inicio = time.monotonic(); self.fin = None
+        self._cancelar = threading.Event()
+        self._hecho = threading.Event()
+
+    def terminado(self):
+        return self._hecho.is_set()
+
+    def cancelado(self):
+        return self._cancelar.is_set()
+
+    # Espera a que acabe, como mucho `segundos` (None = sin límite); devuelve si acabó
+    def esperar(self, segundos=None):
+        return self._hecho.wait(segundos)
+
+    # on_progreso del motor: actualiza el progreso y corta la simulación si se canceló
+    def _avance(self, fraccion):
+        if self._cancelar.is_set(): raise SimulacionCancelada()
+        self.progreso = fraccion
+
+
+class TrabajosSimulacion:
+    # cache: CacheResultados donde se buscan y guardan los resultados.
+    # max_simultaneos: trabajos calculando a la vez (con el GIL, más hilos solo se reparten la CPU);
+    # el resto espera EN_COLA.
+    def __init__(self, cache=None, max_simultaneos=2):
+        self.cache = cache if cache is not None else CacheResultados()
+        self._en_curso = {} # clave -> Trabajo aún sin terminar
+        self._lock = threading.Lock()
+        self._turnos = threading.Semaphore(max_simultaneos)
+
+    # Trabajo de esta configuración: el que ya está en marcha (si no se canceló) o uno nuevo.
+    # diagnostico=True mide el trabajo nuevo con su propio Diagnostico (ver Trabajo.diagnostico).
+    def lanzar(self, config, sesion=None, diagnostico=False, **opciones):
+        config = motor.config_entrada(config) # Sin el resto del estado de la sesión
+        clave = clave_config(config, **opciones)
+        with self._lock:
+            trabajo = self._en_curso.get(clave)
+            if trabajo is None or trabajo.cancelado():
+                trabajo = Trabajo(clave, config, opciones, Diagnostico() if diagnostico else None)
+                self._en_curso[clave] = trabajo
+                threading.Thread(target=self._ejecutar, args=(trabajo,), name=f"simulacion-{clave[:8]}", daemon=True).start()
+            trabajo.sesiones.add(sesion)
+        return trabajo
+
+    # La sesión deja de seguir el trabajo; si ya no lo sigue nadie, se cancela
+    def cancelar(self, trabajo, sesion=None):
+        with self._lock:
+            trabajo.sesiones.discard(sesion)
+            if not trabajo.sesiones: trabajo._cancelar.set()
+
+    # Deja el trabajo anterior de la sesión (si lo hay) y lanza el de la configuración actual
+    def reiniciar(self, anterior, config, sesion=None, diagnostico=False, **opciones):
+        if anterior is not None: self.cancelar(anterior, sesion)
+        return self.lanzar(config, sesion, diagnostico, **opciones)
+
+    def en_curso(self):
+        with self._lock:
+            return list(self._en_curso.values())
+
+    def _ejecutar(self, trabajo):
+        try:
+            with self._turnos:
+                if trabajo.cancelado(): raise SimulacionCancelada()
+                trabajo.estado = EN_CURSO
+                inicio = time.perf_counter()
+                trabajo.resultado = self.cache.simular(trabajo.config, diagnostico=trabajo.diagnostico, on_progreso=trabajo._avance, **trabajo.opciones)
+                if trabajo.diagnostico is not None: trabajo.diagnostico.sumar("simulacion", time.perf_counter() - inicio)
+            trabajo.progreso = 1.0; trabajo.estado = TERMINADO
+        except SimulacionCancelada:
+            trabajo.estado = CANCELADO
+        except Exception as e: # Se muestra en la sesión; el servidor sigue
+            trabajo.error = str(e); trabajo.estado = ERROR
+        finally:
+            trabajo.fin = time.monotonic()
+            with self._lock:
+                if self._en_curso.get(trabajo.clave) is trabajo: del self._en_curso[trabajo.clave]
+            trabajo._hecho.set()
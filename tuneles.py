@@ -0,0 +1,470 @@
+# -*- coding: utf-8 -*-
+import heapq
+import math
+import time
+from bisect import bisect_left, insort
+from collections import deque
+from functools import lru_cache
+
+
+# --- PRODUCTOS ---
+# Códigos enteros (más baratos de comparar que las cadenas en cada add/vaciar)
+HUESOS, CARNE, CONGELADO = 0, 1, 2
+NOMBRES_PRODUCTO = ("Huesos", "Carne", "Congelado")
+CODIGOS_PRODUCTO = {nombre: codigo for codigo, nombre in enumerate(NOMBRES_PRODUCTO)}
+HORAS_CONGELACION = (18, 33, 0) # Por código de producto (valores por defecto de cada túnel)
+
+# Afinidad del túnel: código de producto o uno de estos dos valores
+SIN_AFINIDAD, AFINIDAD_MIXTA = -1, -2
+NOMBRES_AFINIDAD = {SIN_AFINIDAD: "None", AFINIDAD_MIXTA: "Mixed", HUESOS: "Huesos", CARNE: "Carne"}
+
+
+# --- LOTE DENTRO DE UN TÚNEL ---
+# Registro compacto (__slots__) en lugar de un dict por lote: menos memoria y acceso más rápido.
+# hora_lista = hora_entrada + horas de congelación (-inf si ya está congelado).
+class Lote:
+    __slots__ = ("kg", "pallets", "hora_entrada", "producto", "hora_lista")
+
+    def __init__(self, kg, pallets, hora_entrada, producto, horas_congelacion):
+        self.kg = kg
+        self.pallets = pallets
+        self.hora_entrada = hora_entrada
+        self.producto = producto
+        self.hora_lista = hora_entrada + horas_congelacion if horas_congelacion > 0 else -math.inf
+
+    @property
+    def tipo_producto(self):
+        return NOMBRES_PRODUCTO[self.producto]
+
+
+# --- CLASE PARA MODELAR LOS TÚNELES ---
+# <--- CAMBIO: V.8 - Lógica basada en Palés ---
+class Tunnel:
+    # <--- CAMBIO: Constructor ya no recibe max_kg
+    # horas_congelacion: por código de producto (Huesos, Carne[, Congelado]); productos: códigos que admite
+    def __init__(self, name, max_pallets, rows, cols, horas_congelacion=HORAS_CONGELACION, productos=(HUESOS, CARNE)):
+        self.name = name
+        self.max_pallets = float(max_pallets) # Límite físico
+        self.rows = rows
+        self.cols = cols
+        self.horas_congelacion = tuple(horas_congelacion) + HORAS_CONGELACION[len(horas_congelacion):]
+        self.productos = frozenset(productos)
+        
+        self.kg_actual = 0.0 # Variable
+        self.pallets_actual = 0.0 # Variable
+        self.queue = deque() # Lotes (clase Lote) en orden de salida
+        
+        # Contadores de palés por tipo (para visualización)
+        self.pallets_huesos = 0.0 
+        self.pallets_carne = 0.0 
+        self.affinity = "None" 
+        self._afinidad = SIN_AFINIDAD # Mismo valor que 'affinity', como código
+        self._lotes_por_producto = [0, 0] # Lotes de Huesos y de Carne en la cola (la afinidad sale de aquí)
+        self.pasos_por_hora = 1 # Las horas de entrada/congelación se cuentan en pasos del motor
+        # Contadores acumulados (solo se leen para el diagnóstico, ver DespachadorInstrumentado)
+        self.lotes_metidos = 0; self.lotes_sacados = 0; self.vaciados_parciales = 0; self.recalculos_afinidad = 0
+    
+    # O(1): los contadores se mantienen al meter/sacar lotes (_meter_lote / _sacar_lote)
+    def update_affinity(self):
+        self.recalculos_afinidad += 1
+        huesos, carne = self._lotes_por_producto
+        if huesos and carne:
+            self._afinidad = AFINIDAD_MIXTA
+        elif huesos:
+            self._afinidad = HUESOS
+        elif carne:
+            self._afinidad = CARNE
+        else:
+            self._afinidad = SIN_AFINIDAD
+        self.affinity = NOMBRES_AFINIDAD[self._afinidad]
+
+    def _meter_lote(self, lote, al_frente=False):
+        if al_frente: self.queue.appendleft(lote)
+        else: self.queue.append(lote)
+        if lote.producto != CONGELADO: self._lotes_por_producto[lote.producto] += 1
+        self.lotes_metidos += 1
+
+    def _sacar_lote(self):
+        lote = self.queue.popleft()
+        if lote.producto != CONGELADO: self._lotes_por_producto[lote.producto] -= 1
+        self.lotes_sacados += 1
+        return lote
+
+    # <--- CAMBIO: La restricción principal es esta
+    def get_pallets_disponibles(self): 
+        return max(0, self.max_pallets - self.pallets_actual)
+
+    # <--- CAMBIO: 'add_kg' ahora piensa en palés primero
+    # tipo_producto: código (HUESOS, CARNE) o su nombre ("Huesos", "Carne")
+    def add_kg(self, kg_a_anadir, hora_actual, tipo_producto, kg_per_pallet_huesos, kg_per_pallet_carne, force_mix=False):
+        producto = CODIGOS_PRODUCTO.get(tipo_producto, tipo_producto)
+        if producto not in self.productos: # Túnel dedicado a otro producto (ni forzando mezcla)
+            return kg_a_anadir
+        
+        # 1. Lógica de Afinidad (sin cambios)
+        if self._afinidad >= 0 and self._afinidad != producto and not force_mix:
+            return kg_a_anadir 
+
+        # 2. Determinar peso por palé para este lote
+        if producto == HUESOS:
+            kg_por_pale_este_tipo = kg_per_pallet_huesos
+        else:
+            kg_por_pale_este_tipo = kg_per_pallet_carne
+            
+        if kg_por_pale_este_tipo <= 0: # Evitar división por cero
+            return kg_a_anadir 
+
+        # 3. Calcular palés necesarios vs disponibles
+        pallets_necesarios = kg_a_anadir / kg_por_pale_este_tipo
+        pallets_que_caben = self.get_pallets_disponibles()
+        
+        pallets_reales_a_meter = max(0, min(pallets_necesarios, pallets_que_caben))
+        
+        if pallets_reales_a_meter > 0.001: # Si cabe algo
+            # 4. Calcular KG reales y sobrantes
+            kg_reales_a_meter = pallets_reales_a_meter * kg_por_pale_este_tipo
+            kg_sobrantes = kg_a_anadir - kg_reales_a_meter
+            
+            # 5. Añadir lote a la cola
+            self._meter_lote(Lote(kg_reales_a_meter, pallets_reales_a_meter, hora_actual, producto,
+                                   self.horas_congelacion[producto] * self.pasos_por_hora))
+            
+            # 6. Actualizar totales del túnel
+            self.kg_actual += kg_reales_a_meter
+            self.pallets_actual += pallets_reales_a_meter
+            if producto == HUESOS:
+                self.pallets_huesos += pallets_reales_a_meter
+            else:
+                self.pallets_carne += pallets_reales_a_meter
+            
+            self.update_affinity()
+            return kg_sobrantes
+        else:
+            # No cabe nada
+            return kg_a_anadir
+
+    # <--- CAMBIO: 'add_initial_kg' también basado en palés
+    def add_initial_kg(self, kg_iniciales, hora_entrada_calculada, porcentaje_huesos, kg_per_pallet_huesos, kg_per_pallet_carne):
+        
+        pallets_que_caben_total = self.get_pallets_disponibles()
+        if pallets_que_caben_total <= 0.01:
+            return 0.0 # No cabe nada
+
+        kg_metidos_total = 0.0
+        
+        # Caso 1: Producto ya congelado (-999)
+        if hora_entrada_calculada == -999:
+            # Asumimos un peso promedio para los iniciales congelados
+            avg_kg_pallet = (kg_per_pallet_huesos + kg_per_pallet_carne) / 2
+            if avg_kg_pallet < 1: avg_kg_pallet = 1000 # Failsafe
+            
+            pallets_necesarios = kg_iniciales / avg_kg_pallet
+            pallets_reales_a_meter = min(pallets_necesarios, pallets_que_caben_total)
+            kg_reales_a_meter = pallets_reales_a_meter * avg_kg_pallet
+            
+            if pallets_reales_a_meter > 0.01:
+                self._meter_lote(Lote(kg_reales_a_meter, pallets_reales_a_meter, -999, CONGELADO, 0), al_frente=True)
+                self.kg_actual += kg_reales_a_meter
+                self.pallets_actual += pallets_reales_a_meter
+                kg_metidos_total = kg_reales_a_meter
+
+        # Caso 2: Producto fresco (en proceso)
+        else:
+            kg_huesos_iniciales = kg_iniciales * (porcentaje_huesos / 100.0)
+            kg_carne_iniciales = kg_iniciales - kg_huesos_iniciales
+            
+            # (un túnel dedicado solo recibe su producto; el resto pasa al siguiente túnel)
+            pallets_huesos_nec = (kg_huesos_iniciales / kg_per_pallet_huesos) if kg_per_pallet_huesos > 0 and HUESOS in self.productos else 0
+            pallets_carne_nec = (kg_carne_iniciales / kg_per_pallet_carne) if kg_per_pallet_carne > 0 and CARNE in self.productos else 0
+            pallets_necesarios_total = pallets_huesos_nec + pallets_carne_nec
+
+            # Calcular ratio de llenado si no cabe todo
+            ratio = 1.0
+            if pallets_necesarios_total > pallets_que_caben_total:
+                ratio = pallets_que_caben_total / pallets_necesarios_total
+                
+            # Añadir Carne (primero al fondo)
+            if pallets_carne_nec > 0:
+                pallets_carne_a_meter = pallets_carne_nec * ratio
+                kg_carne_a_meter = pallets_carne_a_meter * kg_per_pallet_carne
+                self._meter_lote(Lote(kg_carne_a_meter, pallets_carne_a_meter, hora_entrada_calculada, CARNE,
+                                           self.horas_congelacion[CARNE] * self.pasos_por_hora), al_frente=True)
+                self.kg_actual += kg_carne_a_meter
+                self.pallets_actual += pallets_carne_a_meter
+                self.pallets_carne += pallets_carne_a_meter
+                kg_metidos_total += kg_carne_a_meter
+            
+            # Añadir Huesos (después, quedan más al frente)
+            if pallets_huesos_nec > 0:
+                pallets_huesos_a_meter = pallets_huesos_nec * ratio
+                kg_huesos_a_meter = pallets_huesos_a_meter * kg_per_pallet_huesos
+                self._meter_lote(Lote(kg_huesos_a_meter, pallets_huesos_a_meter, hora_entrada_calculada, HUESOS,
+                                           self.horas_congelacion[HUESOS] * self.pasos_por_hora), al_frente=True)
+                self.kg_actual += kg_huesos_a_meter
+                self.pallets_actual += pallets_huesos_a_meter
+                self.pallets_huesos += pallets_huesos_a_meter
+                kg_metidos_total += kg_huesos_a_meter
+        
+        self.update_affinity() 
+        return kg_metidos_total
+
+    # <--- CAMBIO: Lógica de vaciado proporcional
+    def vaciar_kg(self, kg_a_vaciar_disponibles, hora_actual):
+        kg_realmente_vaciados = 0.0
+        queue = self.queue
+        while kg_a_vaciar_disponibles > 0.01 and queue:
+            lote_frontal = queue[0]
+            
+            if hora_actual >= lote_frontal.hora_lista: # Listo para sacar
+                kg_a_sacar_del_lote = min(kg_a_vaciar_disponibles, lote_frontal.kg)
+                
+                # Calcular palés proporcionales
+                kg_por_pale_lote = 1000 # Failsafe
+                if lote_frontal.pallets > 0.001:
+                    kg_por_pale_lote = lote_frontal.kg / lote_frontal.pallets
+                
+                pallets_a_sacar_del_lote = kg_a_sacar_del_lote / kg_por_pale_lote
+                
+                tipo_lote = lote_frontal.producto
+                
+                if tipo_lote == HUESOS: self.pallets_huesos = max(0, self.pallets_huesos - pallets_a_sacar_del_lote)
+                elif tipo_lote == CARNE: self.pallets_carne = max(0, self.pallets_carne - pallets_a_sacar_del_lote)
+
+                lote_frontal.kg -= kg_a_sacar_del_lote
+                lote_frontal.pallets -= pallets_a_sacar_del_lote
+                self.kg_actual -= kg_a_sacar_del_lote
+                self.pallets_actual -= pallets_a_sacar_del_lote
+                kg_realmente_vaciados += kg_a_sacar_del_lote
+                kg_a_vaciar_disponibles -= kg_a_sacar_del_lote
+                
+                if lote_frontal.kg <= 0.01 or lote_frontal.pallets <= 0.01:
+                    # Ajustar residuos
+                    if tipo_lote == HUESOS: self.pallets_huesos = max(0, self.pallets_huesos - lote_frontal.pallets)
+                    elif tipo_lote == CARNE: self.pallets_carne = max(0, self.pallets_carne - lote_frontal.pallets)
+                    self._sacar_lote()
+                    self.update_affinity() 
+                else: # El primer lote queda a medias
+                    self.vaciados_parciales += 1
+            else: 
+                break 
+        
+        if kg_realmente_vaciados > 0: self.update_affinity() 
+        return kg_realmente_vaciados
+
+    # Argumentos del constructor (para volver a crear el túnel desde un punto de control)
+    def definicion(self):
+        return (self.name, self.max_pallets, self.rows, self.cols, self.horas_congelacion, tuple(sorted(self.productos)))
+
+    # Estado completo (totales y lotes en orden de salida) como tuplas de tipos básicos
+    def exportar_estado(self):
+        lotes = [(l.kg, l.pallets, l.hora_entrada, l.producto, l.hora_lista) for l in self.queue]
+        return (self.kg_actual, self.pallets_actual, self.pallets_huesos, self.pallets_carne, lotes)
+
+    def restaurar_estado(self, estado):
+        self.kg_actual, self.pallets_actual, self.pallets_huesos, self.pallets_carne, lotes = estado
+        self.queue.clear(); self._lotes_por_producto = [0, 0]
+        for kg, pallets, hora_entrada, producto, hora_lista in lotes:
+            lote = Lote(kg, pallets, hora_entrada, producto, 0)
+            lote.hora_lista = hora_lista
+            self._meter_lote(lote)
+        self.update_affinity()
+
+    # Estado mínimo del túnel para registrar en el historial (y poder dibujarlo después)
+    def get_estado(self):
+        return (self.pallets_actual, self.pallets_huesos, self.pallets_carne, self.kg_actual, self.affinity)
+
+    # <--- CAMBIO: Visualización ya no muestra max_kg
+    def get_html_viz(self, compacto=False):
+        return html_tunel(self.name, self.max_pallets, self.rows, self.cols, *self.get_estado(), compacto=compacto)
+
+
+# --- REPARTO Y VACIADO INDEXADOS ---
+# Mantiene los túneles con palés libres indexados por el producto que aceptan y por la
+# hora en que estará listo su primer lote, para que el reparto de cajas y el vaciado solo
+# llamen a los túneles que pueden aceptar/sacar algo. El orden de la lista se respeta
+# (mismo resultado que recorrer todos los túneles uno a uno).
+class DespachadorTuneles:
+    def __init__(self, tuneles):
+        self.tuneles = list(tuneles)
+        # Índices ordenados (por código de producto) de túneles con palés libres que admiten el producto:
+        # forzando mezcla y sin forzarla (vacíos, mixtos o del mismo producto)
+        self._con_hueco = ([], [])
+        self._aceptan = ([], [])
+        self._afinidad = [None] * len(self.tuneles) # None = túnel lleno (no está en ningún índice)
+        # Totales de la flota, actualizados por diferencias (sin recorrer todos los túneles en cada paso)
+        self.kg_total = 0.0; self.pallets_total = 0.0
+        self._kg = [0.0] * len(self.tuneles); self._pallets = [0.0] * len(self.tuneles)
+        self.cambiados = set() # Túneles tocados desde la última vez que el motor vació este conjunto
+        self.tuneles_probados = 0; self.vaciados = 0 # Llamadas a add_kg / vaciar_kg (para el diagnóstico)
+        # Túneles con el primer lote ya listo (ordenados) y montículo (hora_lista, índice) del resto.
+        # Un túnel listo sigue listo hasta que sale su primer lote (las horas solo avanzan).
+        self._listos = []
+        self._listo = [False] * len(self.tuneles)
+        self._pendientes = []
+        self._hora_lista = [None] * len(self.tuneles) # Hora del primer lote ya metida en _pendientes
+        for i in range(len(self.tuneles)): self._actualizar(i)
+
+    # Recoloca el túnel i en los índices tras un cambio de su contenido
+    def _actualizar(self, i):
+        t = self.tuneles[i]
+        self.cambiados.add(i)
+        afinidad = t._afinidad if t.get_pallets_disponibles() > 0.001 else None
+        if afinidad != self._afinidad[i]:
+            for indices in self._indices(i, self._afinidad[i]): del indices[bisect_left(indices, i)]
+            for indices in self._indices(i, afinidad): insort(indices, i)
+            self._afinidad[i] = afinidad
+        if t.kg_actual != self._kg[i]:
+            self.kg_total += t.kg_actual - self._kg[i]; self._kg[i] = t.kg_actual
+        if t.pallets_actual != self._pallets[i]:
+            self.pallets_total += t.pallets_actual - self._pallets[i]; self._pallets[i] = t.pallets_actual
+        if not self._listo[i]:
+            hora = t.queue[0].hora_lista if t.queue else None
+            if hora != self._hora_lista[i]:
+                self._hora_lista[i] = hora
+                if hora is not None: heapq.heappush(self._pendientes, (hora, i))
+
+    # Índices en los que debe estar el túnel i con esta afinidad
+    def _indices(self, i, afinidad):
+        if afinidad is None: return []
+        indices = []
+        for producto in self.tuneles[i].productos:
+            indices.append(self._con_hueco[producto])
+            if afinidad == SIN_AFINIDAD or afinidad == AFINIDAD_MIXTA or afinidad == producto:
+                indices.append(self._aceptan[producto])
+        return indices
+
+    # Reparte kg de un producto en orden de túnel; devuelve los kg que no cupieron.
+    # Sin force_mix solo se prueban túneles vacíos, mixtos o del mismo producto.
+    def repartir(self, kg, hora_actual, producto, kg_per_pallet_huesos, kg_per_pallet_carne, force_mix=False):
+        if kg <= 0.01: return kg
+        # Cada túnel solo cambia al meterle kg (ya recorrido): los índices se actualizan al final
+        usados = []
+        for i in (self._con_hueco if force_mix else self._aceptan)[producto]:
+            if kg <= 0.01: break
+            kg = self.tuneles[i].add_kg(kg, hora_actual, producto, kg_per_pallet_huesos, kg_per_pallet_carne, force_mix=force_mix)
+            usados.append(i)
+        for i in usados: self._actualizar(i)
+        self.tuneles_probados += len(usados)
+        return kg
+
+    # Vacía kg en orden de túnel, solo de los túneles con el primer lote ya congelado;
+    # devuelve los kg que quedaron por vaciar
+    def vaciar(self, kg, hora_actual):
+        listos = self._listos
+        while self._pendientes and self._pendientes[0][0] <= hora_actual:
+            hora, i = heapq.heappop(self._pendientes)
+            if not self._listo[i] and self._hora_lista[i] == hora: # Si no, entrada obsoleta
+                self._listo[i] = True
+                insort(listos, i)
+        usados = []
+        for i in listos:
+            if kg <= 0.01: break
+            kg -= self.tuneles[i].vaciar_kg(kg, hora_actual)
+            usados.append(i)
+        for i in usados:
+            t = self.tuneles[i]
+            if not t.queue or t.queue[0].hora_lista > hora_actual: # Su nuevo primer lote aún no está listo
+                del listos[bisect_left(listos, i)]
+                self._listo[i] = False
+                self._hora_lista[i] = None
+            self._actualizar(i)
+        self.vaciados += len(usados)
+        return kg
+
+    # Hora (en pasos) en la que el primer lote de algún túnel estará listo: -inf si ya hay
+    # alguno listo, None si no hay lotes
+    def hora_lista_minima(self):
+        if self._listos: return -math.inf
+        pendientes = self._pendientes
+        while pendientes and self._hora_lista[pendientes[0][1]] != pendientes[0][0]:
+            heapq.heappop(pendientes)
+        return pendientes[0][0] if pendientes else None
+
+
+# Mismo reparto y vaciado, midiendo cada llamada (simulate(..., diagnostico=d) lo usa en lugar
+# de DespachadorTuneles; ver diagnostico.py). Los contadores los llevan los túneles y el
+# despachador siempre; volcar_contadores() pasa al diagnóstico lo acumulado desde la creación.
+class DespachadorInstrumentado(DespachadorTuneles):
+    def __init__(self, tuneles, diagnostico):
+        super().__init__(tuneles)
+        self.diagnostico = diagnostico
+        self._contadores_iniciales = self.contadores()
+
+    def repartir(self, kg, hora_actual, producto, kg_per_pallet_huesos, kg_per_pallet_carne, force_mix=False):
+        if kg <= 0.01: return kg
+        inicio = time.perf_counter()
+        kg = super().repartir(kg, hora_actual, producto, kg_per_pallet_huesos, kg_per_pallet_carne, force_mix)
+        self.diagnostico.sumar("cajas (pasada 2)" if force_mix else "cajas (pasada 1)", time.perf_counter() - inicio)
+        self.diagnostico.contar("pasadas_reparto")
+        return kg
+
+    def vaciar(self, kg, hora_actual):
+        inicio = time.perf_counter()
+        kg = super().vaciar(kg, hora_actual)
+        self.diagnostico.sumar("vaciado", time.perf_counter() - inicio)
+        return kg
+
+    def contadores(self):
+        t = self.tuneles
+        return {
+            'tuneles_probados': self.tuneles_probados, 'vaciados': self.vaciados,
+            'lotes_creados': sum(x.lotes_metidos for x in t), 'lotes_vaciados': sum(x.lotes_sacados for x in t),
+            'lotes_partidos': sum(x.vaciados_parciales for x in t), 'recalculos_afinidad': sum(x.recalculos_afinidad for x in t),
+        }
+
+    def volcar_contadores(self):
+        for contador, valor in self.contadores().items():
+            self.diagnostico.contar(contador, valor - self._contadores_iniciales[contador])
+        self._contadores_iniciales = self.contadores()
+
+
+# --- VISUALIZACIÓN HTML DE UN TÚNEL ---
+# Función independiente de la clase: permite dibujar un túnel a partir de un estado
+# guardado en el historial del motor sin reconstruir el objeto Tunnel.
+# compacto=True dibuja la ocupación como una sola barra con degradado CSS en lugar de una
+# celda por palé (para flotas grandes). kg_redondeo agrupa los kg mostrados (1 = kg exactos).
+def html_tunel(name, max_pallets, rows, cols, pallets_actual, pallets_huesos, pallets_carne, kg_actual, affinity, compacto=False, kg_redondeo=1):
+    total_celdas = cols * rows
+    num_pallets_llenos_total_visual = min(int(round(pallets_actual)), total_celdas)
+    num_pallets_huesos_visual = min(int(round(pallets_huesos)), num_pallets_llenos_total_visual)
+    num_pallets_carne_visual = min(int(round(pallets_carne)), num_pallets_llenos_total_visual - num_pallets_huesos_visual)
+    num_pallets_otros_visual = num_pallets_llenos_total_visual - num_pallets_huesos_visual - num_pallets_carne_visual
+    kg_mostrados = round(kg_actual / kg_redondeo) * kg_redondeo
+    return _html_tunel(name, max_pallets, rows, cols, num_pallets_huesos_visual, num_pallets_carne_visual,
+                       num_pallets_otros_visual, kg_mostrados, affinity, compacto)
+
+
+# El HTML solo depende de los palés redondeados por tipo, la afinidad y los kg mostrados, que se
+# repiten mucho entre pasos: se guardan los últimos dibujos (los menos usados se descartan)
+@lru_cache(maxsize=4096)
+def _html_tunel(name, max_pallets, rows, cols, num_pallets_huesos_visual, num_pallets_carne_visual, num_pallets_otros_visual, kg_actual, affinity, compacto):
+    total_celdas = cols * rows
+    num_pallets_llenos_total_visual = num_pallets_huesos_visual + num_pallets_carne_visual + num_pallets_otros_visual
+    num_celdas_vacias = total_celdas - num_pallets_llenos_total_visual
+    if compacto:
+        # Las celdas se llenan por columnas: la barra se reparte de izquierda a derecha
+        fin_huesos = 100.0 * num_pallets_huesos_visual / total_celdas if total_celdas else 0.0
+        fin_carne = fin_huesos + 100.0 * num_pallets_carne_visual / total_celdas if total_celdas else 0.0
+        fin_otros = 100.0 * num_pallets_llenos_total_visual / total_celdas if total_celdas else 0.0
+        grid_html = (f'<div class="tunnel-bar" style="--rows: {rows}; --cols: {cols}; background: linear-gradient(to right, '
+                     f'var(--color-huesos) 0 {fin_huesos:.1f}%, var(--color-carne) {fin_huesos:.1f}% {fin_carne:.1f}%, '
+                     f'var(--primary-color) {fin_carne:.1f}% {fin_otros:.1f}%, #bdc3c7 {fin_otros:.1f}%);"></div>')
+    else:
+        celdas_html = ""
+        celdas_html += f'<div class="tunnel-cell filled-huesos"></div>' * num_pallets_huesos_visual
+        celdas_html += f'<div class="tunnel-cell filled-carne"></div>' * num_pallets_carne_visual
+        celdas_html += f'<div class="tunnel-cell filled"></div>' * num_pallets_otros_visual
+        celdas_html += f'<div class="tunnel-cell"></div>' * num_celdas_vacias
+        grid_html = f'<div class="tunnel-grid-container" style="--rows: {rows};">{celdas_html}</div>'
+    
+    pallets_str = f"{num_pallets_llenos_total_visual} / {int(max_pallets)}"
+    # Mostramos solo KG actuales, max_kg ya no es fijo
+    kg_str = f"({kg_actual:,.0f} kg)".replace(',', '.')
+    
+    affinity_label = f" ({affinity})" if affinity != "None" else " (Vacío)"
+    
+    return f"""<div class="tunnel-visualization">
+               <div class="tunnel-label">{name}{affinity_label}</div> 
+               <div class="tunnel-stats">{pallets_str} palés<br>{kg_str}</div>
+               {grid_html}
+           </div>"""